@@ -0,0 +1,54 @@
+import os, sys, importlib
+
+COMMON = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(COMMON, "..")
+
+# The algorithms import shared helpers, such as batching, from this directory.
+if COMMON not in sys.path:
+    sys.path.append(COMMON)
+
+#A dictionary to map the algorithm name to the directory and filename
+# "maximal" keeps a maximal matching of the whole graph, guided by the levels of fractionalalgo1, so it is a 2-approximation. It is not the
+# degree-split rounding of Bhattacharya and Kiss, and does not meet their polylogarithmic bound: the worst-case work per update is only
+# bounded by the degree, see integral_rounding.py.
+ALGORITHMS = {"fractional1": ["fractional_matching_1", "fractionalalgo1"], "fractional2": ["fractional_matching_2", "fractionalalgo2"], "integral1": ["integral_matching_1", "integralalgo1"], "integral2": ["integral_matching_2", "integralalgo2"], "maximal": ["fractional_matching_1", "integral_rounding"]}
+
+
+# Imports the module implementing the named algorithm.
+# Both integral drivers import a helper module called vertex_cover, so any previously imported copy is dropped first.
+# This lets a single process load several algorithms one after the other.
+def load_algorithm(name):
+    path = os.path.join(ROOT, ALGORITHMS[name][0])
+    fname = ALGORITHMS[name][1]
+    for module in ["vertex_cover", fname]:
+        sys.modules.pop(module, None)
+    sys.path.insert(0, path)
+    try:
+        return importlib.import_module(fname)
+    finally:
+        sys.path.remove(path)
+
+
+def is_integral(name):
+    return "integral" in ALGORITHMS[name][1]
+
+
+# Constructs the named algorithm. The integral algorithms work on bipartite graphs and also need the bipartition.
+# With deamortized, the Gupta-Peng drivers spread each rebuild over the updates that follow it. The other algorithms have no rebuild to spread and ignore it.
+def create_algorithm(name, epsilon, n, bip_cut=0, deamortized=False):
+    alg = load_algorithm(name)
+    if not is_integral(name):
+        return alg.Algorithm(epsilon, n)
+    if ALGORITHMS[name][0].startswith("integral"):
+        return alg.Algorithm(epsilon, n, bip_cut, deamortized=deamortized)
+    return alg.Algorithm(epsilon, n, bip_cut)
+
+
+# Reads back an algorithm written to a snapshot file by its snapshot method.
+def restore_algorithm(name, path):
+    return load_algorithm(name).Algorithm.restore(path)
+
+
+# The size of the solution an algorithm maintains: the matching for the integral algorithms, the vertex cover otherwise.
+def result_size(Graph, integral):
+    return Graph.matching_size() if integral else Graph.cover_size()
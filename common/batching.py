@@ -0,0 +1,27 @@
+from itertools import islice
+
+# Helpers for applying updates in batches.
+
+
+# Reduces a batch of updates to its net effect. An edge touched several times in the batch ends up either present or absent,
+# so only its last update matters, and it is dropped altogether if the edge ends the batch in the state it started in,
+# i.e. if its first and last updates differ. Deletions are returned before insertions.
+def coalesce(updates):
+    first = {}
+    last = {}
+    for operation, u, v in updates:
+        edge = (u, v) if u < v else (v, u)
+        if edge not in first:
+            first[edge] = operation
+        last[edge] = (operation, u, v)
+    net = [last[edge] for edge in last if first[edge] == last[edge][0]]
+    return [update for update in net if update[0] == "del"] + [update for update in net if update[0] == "ins"]
+
+
+# Splits an update stream into lists of at most size updates.
+def chunked(updates, size):
+    updates = iter(updates)
+    chunk = list(islice(updates, size))
+    while len(chunk) != 0:
+        yield chunk
+        chunk = list(islice(updates, size))
@@ -0,0 +1,161 @@
+import sys, os, json, time, resource, tempfile, multiprocessing
+from algorithms import ALGORITHMS, create_algorithm, is_integral, result_size
+from update_log import BinaryUpdateWriter, BinaryUpdateLog, OPERATIONS
+from workloads import WORKLOADS, stream
+from batching import chunked
+
+# Benchmarks the algorithms on generated traces, without any animation.
+#
+# Usage: python benchmark.py [--algorithms=fractional1,integral2] [--n=100,1000] [--epsilon=0.1,0.3] [--updates=10000]
+#                            [--model=uniform] [--seed=0] [--batch=0] [--deamortized] [--output=results.json] [--baseline=old.json] [--threshold=0.1]
+#
+# One bipartite trace is generated for every combination of n, epsilon and number of updates, and each algorithm replays the same trace.
+# Every run happens in a fresh process, so the peak RSS reported for a run belongs to that run alone.
+# With a positive --batch, the updates are applied through apply_batch in chunks of that size, and the latencies are those of whole chunks.
+# With --deamortized, the integral drivers spread each rebuild over the updates after it, which trades a little throughput for a lower p99 latency.
+# After the replay, the final state is written to a snapshot and restored from it, and the restore time is reported next to the
+# replay time it saves. Results are written as JSON together with a summary table. With --baseline, each run is compared against the matching run of an
+# earlier results file, and runs whose throughput dropped, or whose p99 latency grew, by more than the threshold are flagged.
+
+DEFAULTS = {"algorithms": ",".join(ALGORITHMS), "n": "100,1000", "epsilon": "0.1", "updates": "10000", "model": "uniform", "seed": "0", "batch": "0", "deamortized": "0", "threshold": "0.1"}
+
+
+# Writes the trace for one grid point to a binary update file.
+def write_trace(path, model, n, epsilon, number_of_updates, seed):
+    bip_cut = n // 2
+    writer = BinaryUpdateWriter(path, epsilon, n, bip_cut)
+    stream(WORKLOADS[model](n, bip_cut, seed), number_of_updates, writer)
+    writer.close()
+
+
+# Nearest-rank percentile of an ascending list.
+def percentile(values, p):
+    if len(values) == 0:
+        return 0
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+# Replays a trace through one algorithm and measures it. This runs inside a worker process.
+def run(name, path, batch=0, deamortized=False):
+    log = BinaryUpdateLog(path)
+    start = time.perf_counter()
+    Graph = create_algorithm(name, log.epsilon, log.n, log.bip_cut, deamortized)
+    construction = time.perf_counter() - start
+
+    latencies = []
+    clock = time.perf_counter_ns
+    insert = Graph.insert
+    delete = Graph.delete
+    start = time.perf_counter()
+    if batch > 0:
+        for chunk in chunked(((OPERATIONS[op], u, v) for op, u, v in log.records()), batch):
+            before = clock()
+            Graph.apply_batch(chunk)
+            latencies.append(clock() - before)
+    else:
+        for op, u, v in log.records():
+            before = clock()
+            if op == 0:
+                insert(u, v)
+            else:
+                delete(u, v)
+            latencies.append(clock() - before)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    snapshot_path = path + ".snapshot"
+    start = time.perf_counter()
+    Graph.snapshot(snapshot_path, log.count)
+    snapshot_time = time.perf_counter() - start
+    start = time.perf_counter()
+    type(Graph).restore(snapshot_path)
+    restore_time = time.perf_counter() - start
+    snapshot_size = os.path.getsize(snapshot_path)
+    os.remove(snapshot_path)
+
+    result = {"construction_s": construction, "elapsed_s": elapsed, "throughput": log.count / elapsed if elapsed > 0 else 0,
+              "p50_us": percentile(latencies, 50) / 1000, "p99_us": percentile(latencies, 99) / 1000, "max_us": (latencies[-1] if latencies else 0) / 1000,
+              "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, "result_size": result_size(Graph, is_integral(name)),
+              "snapshot_s": snapshot_time, "restore_s": restore_time, "snapshot_kib": snapshot_size / 1024}
+    log.close()
+    return result
+
+
+def run_isolated(name, path, batch=0, deamortized=False):
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        try:
+            return pool.apply(run, (name, path, batch, deamortized))
+        except Exception as error:
+            return {"error": "{}: {}".format(type(error).__name__, error)}
+
+
+def key(result):
+    return (result["algorithm"], result["model"], result["n"], result["epsilon"], result["updates"], result.get("batch", 0), result.get("deamortized", False))
+
+
+def benchmark(options):
+    results = []
+    deamortized = options["deamortized"] != "0"
+    directory = tempfile.mkdtemp()
+    for n in [int(value) for value in options["n"].split(",")]:
+        for epsilon in [float(value) for value in options["epsilon"].split(",")]:
+            for number_of_updates in [int(value) for value in options["updates"].split(",")]:
+                path = os.path.join(directory, "trace.bin")
+                write_trace(path, options["model"], n, epsilon, number_of_updates, int(options["seed"]))
+                for name in options["algorithms"].split(","):
+                    result = {"algorithm": name, "model": options["model"], "n": n, "epsilon": epsilon, "updates": number_of_updates, "seed": int(options["seed"]), "batch": int(options["batch"]),
+                              "deamortized": deamortized}
+                    result.update(run_isolated(name, path, int(options["batch"]), deamortized))
+                    results.append(result)
+                    print_row(result)
+                os.remove(path)
+    os.rmdir(directory)
+    return results
+
+
+# Compares the results against a baseline, returning the runs that got slower by more than the threshold.
+def compare(results, baseline, threshold):
+    previous = {key(result): result for result in baseline if "error" not in result}
+    regressions = []
+    for result in results:
+        old = previous.get(key(result))
+        if old is None or "error" in result:
+            continue
+        reasons = []
+        if result["throughput"] < old["throughput"] * (1 - threshold):
+            reasons.append("throughput {:.0f} -> {:.0f} updates/s".format(old["throughput"], result["throughput"]))
+        if result["p99_us"] > old["p99_us"] * (1 + threshold):
+            reasons.append("p99 {:.1f} -> {:.1f} us".format(old["p99_us"], result["p99_us"]))
+        if len(reasons) != 0:
+            regressions.append((result, reasons))
+    return regressions
+
+
+HEADER = "{:<12} {:>8} {:>7} {:>9} {:>12} {:>10} {:>10} {:>11} {:>10} {:>10} {:>10} {:>10} {:>8}".format(
+    "algorithm", "n", "eps", "updates", "updates/s", "p50 us", "p99 us", "max us", "rss MiB", "build s", "replay s", "restore s", "size")
+
+
+def print_row(result):
+    if "error" in result:
+        print("{:<12} {:>8} {:>7} {:>9}  {}".format(result["algorithm"], result["n"], result["epsilon"], result["updates"], result["error"]))
+        return
+    print("{:<12} {:>8} {:>7} {:>9} {:>12.0f} {:>10.1f} {:>10.1f} {:>11.1f} {:>10.1f} {:>10.3f} {:>10.3f} {:>10.3f} {:>8}".format(
+        result["algorithm"], result["n"], result["epsilon"], result["updates"], result["throughput"], result["p50_us"], result["p99_us"],
+        result["max_us"], result["peak_rss_kib"] / 1024, result["construction_s"], result["elapsed_s"], result["restore_s"], result["result_size"]))
+
+
+if __name__ == "__main__":
+    options = dict(DEFAULTS)
+    options.update(dict(arg[2:].split("=", 1) if "=" in arg else (arg[2:], "1") for arg in sys.argv[1:] if arg.startswith("--")))
+    print(HEADER)
+    results = benchmark(options)
+    if "output" in options:
+        with open(options["output"], "w") as file:
+            json.dump({"options": options, "results": results}, file, indent=1)
+    if "baseline" in options:
+        with open(options["baseline"]) as file:
+            regressions = compare(results, json.load(file)["results"], float(options["threshold"]))
+        for result, reasons in regressions:
+            print("SLOWER {} n={} eps={} updates={}: {}".format(result["algorithm"], result["n"], result["epsilon"], result["updates"], ", ".join(reasons)))
+        if len(regressions) != 0:
+            sys.exit(1)
@@ -0,0 +1,32 @@
+from instrumentation import Stats
+from snapshot import Snapshotted
+
+# A set of nodes that grows with the ids it sees. n is only the initial number of nodes: inserting an edge at a node beyond it
+# makes room for more through ensure_vertex, which at least doubles the number of nodes each time, so that growing to n nodes
+# takes O(n) time overall. A subclass keeps the number of nodes in self.n, and extends its per-node lists up to a new n in grow.
+class Growable:
+    def ensure_vertex(self, v):
+        if v >= self.n:
+            self.grow(max(v + 1, 2 * self.n))
+
+
+# What the tools in common/ expect of every algorithm besides its updates, and besides save and load, see snapshot.py.
+# enable_stats starts counting the work done by each update, and returns the Stats object the counters are kept in, see instrumentation.py.
+# The queries matching_size, fractional_weight, cover_size, in_cover, mate, cover_nodes and matched_edges read the maintained state without
+# copying it. The ones below are for an algorithm without an integral matching; the others depend on how each algorithm keeps its cover.
+class DynamicGraph(Growable, Snapshotted):
+    def enable_stats(self, callback=None):
+        self.stats = Stats(callback)
+        return self.stats
+
+    def disable_stats(self):
+        self.stats = None
+
+    def matching_size(self):
+        return 0
+
+    def mate(self, v):
+        return None
+
+    def matched_edges(self):
+        return iter(())
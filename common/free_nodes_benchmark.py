@@ -0,0 +1,129 @@
+import sys, time, heapq, bisect
+from algorithms import load_algorithm
+from workloads import WORKLOADS
+
+# Measures the free nodes of integral_matching_1's vertex cover, bucketed by degree, against two structures keyed by (degree, node):
+# an ordered list, which removes and inserts a pair on every degree change as the ordered tree the buckets replaced did, and a heap.
+# Usage: python free_nodes_benchmark.py [--model=uniform] [--n=300] [--bip_cut=0] [--updates=100000] [--seed=0]
+#
+# A trace is replayed through the vertex cover once, recording every call it makes on its free nodes. The recorded calls are then
+# replayed on their own against each structure, so that the times compare the structures and nothing else. The default is a dense
+# uniform trace, where every update changes the degrees of free nodes and the cover asks for a free node of maximum degree on each deletion.
+
+DEFAULTS = {"model": "uniform", "n": "300", "bip_cut": "0", "updates": "100000", "seed": "0"}
+
+
+# Passes every call on to the free nodes of the vertex cover and records it.
+class Recorder:
+    def __init__(self, free_nodes, calls):
+        self.free_nodes = free_nodes
+        self.calls = calls
+
+    def insert(self, v, degree):
+        self.calls.append(("insert", v, degree))
+        self.free_nodes.insert(v, degree)
+
+    def delete(self, v, degree):
+        self.calls.append(("delete", v, degree))
+        self.free_nodes.delete(v, degree)
+
+    def move(self, v, old_degree, new_degree):
+        self.calls.append(("move", v, old_degree, new_degree))
+        self.free_nodes.move(v, old_degree, new_degree)
+
+    def max_degree(self):
+        self.calls.append(("max_degree",))
+        return self.free_nodes.max_degree()
+
+    def grow(self, n):
+        self.calls.append(("grow", n))
+        self.free_nodes.grow(n)
+
+
+# The free nodes as an ordered list of (degree, node) pairs. A degree change removes the old pair and inserts the new one, each found by bisection.
+class Free_Ordered:
+    def __init__(self, n):
+        self.pairs = [(0, v) for v in range(n)]
+
+    def insert(self, v, degree):
+        bisect.insort(self.pairs, (degree, v))
+
+    def delete(self, v, degree):
+        del self.pairs[bisect.bisect_left(self.pairs, (degree, v))]
+
+    def move(self, v, old_degree, new_degree):
+        self.delete(v, old_degree)
+        self.insert(v, new_degree)
+
+    def max_degree(self):
+        return self.pairs[-1][1] if len(self.pairs) != 0 else None
+
+    def grow(self, n):
+        for v in range(len(self.pairs), n):
+            self.insert(v, 0)
+
+
+# The free nodes as a heap of (-degree, node) pairs. A node that moves or leaves keeps its old pair in the
+# heap, which is dropped once it reaches the top, so every operation takes O(log n) amortized time.
+class Free_Heap:
+    def __init__(self, n):
+        self.heap = [(0, v) for v in range(n)]
+        self.degrees = [0 for v in range(n)] # The degree of each free node, or None for a matched one
+
+    def insert(self, v, degree):
+        self.degrees[v] = degree
+        heapq.heappush(self.heap, (-degree, v))
+
+    def delete(self, v, degree):
+        self.degrees[v] = None
+
+    def move(self, v, old_degree, new_degree):
+        self.insert(v, new_degree)
+
+    def max_degree(self):
+        heap = self.heap
+        while len(heap) != 0 and self.degrees[heap[0][1]] != -heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][1] if len(heap) != 0 else None
+
+    def grow(self, n):
+        for v in range(len(self.degrees), n):
+            self.degrees.append(None)
+            self.insert(v, 0)
+
+
+def record(model, n, bip_cut, number_of_updates, seed):
+    Vertex_Cover = load_algorithm("integral1").Vertex_Cover
+    vc = Vertex_Cover(n)
+    calls = []
+    vc.free_nodes = Recorder(vc.free_nodes, calls)
+    for operation, u, v in WORKLOADS[model](n, bip_cut, seed).updates(number_of_updates):
+        if operation == "ins":
+            vc.insert(u, v)
+        else:
+            vc.delete(u, v)
+    return calls, 2 * vc.num_edges / n
+
+
+# Replays the recorded calls on a new structure, and returns the time taken.
+def replay(structure, n, calls):
+    free_nodes = structure(n)
+    start = time.perf_counter()
+    for call in calls:
+        getattr(free_nodes, call[0])(*call[1:])
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    options = dict(DEFAULTS)
+    options.update(dict(arg[2:].split("=", 1) if "=" in arg else (arg[2:], "1") for arg in sys.argv[1:] if arg.startswith("--")))
+    n = int(options["n"])
+    calls, average_degree = record(options["model"], n, int(options["bip_cut"]), int(options["updates"]), int(options["seed"]))
+    Free_Buckets = sys.modules[load_algorithm("integral1").Vertex_Cover.__module__].Free_Buckets
+    print("{} n={} average degree {:.1f}: {} calls on the free nodes".format(options["model"], n, average_degree, len(calls)))
+    results = {}
+    for name, structure in [("buckets", Free_Buckets), ("ordered", Free_Ordered), ("heap", Free_Heap)]:
+        elapsed = min(replay(structure, n, calls) for repeat in range(3))
+        results[name] = elapsed
+        print("{:<8} {:>8.3f} s   {:>6.2f} us per call".format(name, elapsed, elapsed / len(calls) * 1e6))
+    print("speedup of the buckets: {:.2f}x over the ordered list, {:.2f}x over the heap".format(results["ordered"] / results["buckets"], results["heap"] / results["buckets"]))
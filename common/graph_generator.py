@@ -1,65 +1,43 @@
-import math
 import sys, random
+from update_log import BinaryUpdateWriter, TextUpdateWriter
+from workloads import WORKLOADS, stream
+
+# Usage: python graph_generator.py <epsilon> <n> <number of updates> <is bipartite: 0 or 1> [bin] [--model=NAME] [--seed=S]
+# With "bin" the updates are written in the binary format of update_log.py, to graph.bin or graph_bip.bin.
+# The model is one of the workloads in workloads.py and defaults to "uniform". Runs with the same seed produce the same file.
 
 class Generator:
-    def __init__(self):
-        self.epsilon = sys.argv[1]
-        self.n = int(sys.argv[2])
-        self.number_of_updates = int(sys.argv[3])
-        self.max_edges = (self.n * (self.n - 1)) / 2
-        is_bipartite = sys.argv[4]
-        self.create_graph() if is_bipartite == "0" else self.create_bipartite_graph()
+    def __init__(self, epsilon, n, number_of_updates, is_bipartite, binary=False, model="uniform", seed=None):
+        self.epsilon = epsilon
+        self.n = n
+        self.number_of_updates = number_of_updates
+        self.binary = binary
+        self.random = random.Random(seed)
+        self.model = model
+        self.create_graph() if not is_bipartite else self.create_bipartite_graph()
 
-    def all_edges(self):
-        s = set()
-        for i in range(0, self.n):
-            for j in range(i+1, self.n):
-                s.add((i, j))
-        return s
+    # Opens the output file in the requested format. Both writers take updates one at a time.
+    def open_writer(self, name, bip_cut=None):
+        if self.binary:
+            return BinaryUpdateWriter(name + ".bin", self.epsilon, self.n, 0 if bip_cut is None else bip_cut)
+        return TextUpdateWriter(name + ".txt", self.epsilon, self.n, bip_cut)
 
-    def all_edges_bipartite(self, bip_cut):
-        s = set()
-        for i in range(0, bip_cut):
-            for j in range(bip_cut, self.n):
-                s.add((i, j))
-        return s
+    # The workload is seeded from the generator, so a single seed fixes both the bipartition and the updates.
+    def write_updates(self, file, bip_cut):
+        workload = WORKLOADS[self.model](self.n, bip_cut, self.random.getrandbits(64))
+        stream(workload, self.number_of_updates, file)
+        file.close()
 
     def create_graph(self):
-        file = open("graph.txt", "w")
-        file.write(self.epsilon + " " + str(self.n) + "\n")
-        added_edges = set()
-        possible_edges = self.all_edges()
-        for update in range(self.number_of_updates):
-            edge_proportion = len(added_edges) / self.max_edges
-            del_prob = math.sin(math.pi * 0.5 * edge_proportion)
-            if random.random() <= del_prob: 
-                edge = random.choice(tuple(added_edges))
-                file.write("del " + str(edge[0]) + " " + str(edge[1]) + "\n")
-                added_edges.remove(edge)
-                possible_edges.add(edge)
-            else:
-                edge = random.choice(tuple(possible_edges))
-                file.write("ins " + str(edge[0]) + " " + str(edge[1]) + "\n")
-                possible_edges.remove(edge)
-                added_edges.add(edge)
+        self.write_updates(self.open_writer("graph"), 0)
 
     def create_bipartite_graph(self):
-        file = open("graph_bip.txt", "w")
-        bip_cut = random.randint(int(self.n/3), int(2*self.n/3))
-        file.write(self.epsilon + " " + str(self.n) + " " + str(bip_cut) + "\n")
-        added_edges = set()
-        possible_edges = self.all_edges_bipartite(bip_cut)
-        for update in range(self.number_of_updates):
-            edge_proportion = len(added_edges) / self.max_edges
-            del_prob = math.sin(math.pi * 0.5 * edge_proportion)
-            if random.random() <= del_prob: 
-                edge = random.choice(tuple(added_edges))
-                file.write("del " + str(edge[0]) + " " + str(edge[1]) + "\n")
-                added_edges.remove(edge)
-                possible_edges.add(edge)
-            else:
-                edge = random.choice(tuple(possible_edges))
-                file.write("ins " + str(edge[0]) + " " + str(edge[1]) + "\n")
-                possible_edges.remove(edge)
-                added_edges.add(edge)
-Generator()
\ No newline at end of file
+        bip_cut = self.random.randint(int(self.n/3), int(2*self.n/3))
+        self.write_updates(self.open_writer("graph_bip", bip_cut), bip_cut)
+
+
+if __name__ == "__main__":
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--"))
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    seed = int(options["seed"]) if "seed" in options else None
+    Generator(args[0], int(args[1]), int(args[2]), args[3] != "0", len(args) > 4 and args[4] == "bin", options.get("model", "uniform"), seed)
@@ -1,39 +1,78 @@
-import sys, importlib, animator
+import sys, time
+from algorithms import create_algorithm, restore_algorithm, is_integral, result_size
+from snapshot import snapshot_position
+from update_stream import open_updates
+from batching import chunked
+from vertex_ids import VertexIds
+
+# Usage: python graph_input.py <algorithm> <update file> [--headless] [--batch=<size>] [--restore=<snapshot>] [--snapshot=<snapshot>] [--relabel]
+#                          [--deamortized]
+# The update file may be in the text or the binary format, or "-" to read text updates from standard input.
+# In headless mode the updates are streamed straight into the algorithm without any animation, and tkinter is never imported.
+# With --batch, headless mode feeds the updates to the algorithm's apply_batch in chunks of the given size.
+# With --restore, headless mode starts from a snapshot of the algorithm instead of an empty graph, and skips the updates it already holds.
+# With --snapshot, headless mode writes a snapshot of the algorithm after the last update, to restart from later.
+# With --relabel, headless mode maps the node ids of the update file to dense ids in order of first appearance, and the algorithm starts with
+# a single node and grows with the graph, so that sparse ids cost no memory. This is only possible for graphs that are not bipartite.
+# With --deamortized, the integral drivers spread each rebuild over the updates after it, see create_algorithm. A restored algorithm keeps the mode it was saved with.
 
 class GraphInput:
-    def __init__(self):
-        #A dictionary to map the algorithm name to the directory and filename
-        algorithms = {"fractional1": ["../fractional_matching_1", "fractionalalgo1"], "fractional2": ["../fractional_matching_2", "fractionalalgo2"], "integral1": ["../integral_matching_1", "integralalgo1"], "integral2": ["../integral_matching_2", "integralalgo2"]}
+    def __init__(self, args, headless=False, batch=None, restore=None, snapshot=None, relabel=False, deamortized=False):
+        name = args[0]
+
+        # Retrieves the values of n and epsilon, which were specified when the graph was generated.
+        # The updates themselves are parsed lazily, one line at a time.
+        epsilon, n, bip_cut, updates = open_updates(args[1])
+        if headless and relabel:
+            if bip_cut:
+                raise ValueError("relabelling would lose the bipartition of {}".format(args[1]))
+            self.ids = VertexIds()
+            updates = self.ids.relabel(updates)
+            n = 1
+        integral = is_integral(name)
+        position = 0
+        if headless and restore:
+            Graph = restore_algorithm(name, restore)
+            position = snapshot_position(restore)
+            for i in range(position):
+                next(updates)
+        else:
+            Graph = create_algorithm(name, epsilon, n, bip_cut, deamortized)
 
+        if headless:
+            count = self.run_headless(Graph, updates, integral, batch)
+            if snapshot:
+                Graph.snapshot(snapshot, position + count)
+        else:
+            self.run_animated(Graph, updates, integral, n)
 
-        path = algorithms[sys.argv[1]][0]
-        fname = algorithms[sys.argv[1]][1]
-        sys.path.append(path)
-        alg = importlib.import_module(fname)
 
-        # Corrects the formatting of the text file so that it is ready for use.
-        # Retrieves the values of n and epsilon, which were specified when the graph was generated.
-        file = open(sys.argv[2], "r")
-        str_file = []
-        for line in file:
-            line = line.strip("\n")
-            line = line.split(" ")
-            str_file.append(line)
-
-        epsilon = float(str_file[0][0])
-        n = int(str_file[0][1])
-        bip_cut = 0
-        is_integral = "integral" in fname
-        if is_integral:
-            bip_cut = int(str_file[0][2])
+    # Applies the updates to the algorithm only, and reports the throughput and the size of the final solution.
+    def run_headless(self, Graph, updates, integral, batch=None):
+        count = 0
+        start = time.perf_counter()
+        if batch:
+            for chunk in chunked(updates, batch):
+                Graph.apply_batch(chunk)
+                count += len(chunk)
+        else:
+            for operation, u, v in updates:
+                if operation == "ins":
+                    Graph.insert(u, v)
+                elif operation == "del":
+                    Graph.delete(u, v)
+                count += 1
+        elapsed = time.perf_counter() - start
+        print("{} updates in {:.3f}s ({:.0f} updates/s)".format(count, elapsed, count / elapsed if elapsed > 0 else 0))
+        print("{} size: {}".format("matching" if integral else "vertex cover", result_size(Graph, integral)))
+        return count
+
+
+    # We apply each update to both the algorithm and the animator
+    def run_animated(self, Graph, updates, integral, n):
+        import animator
         self.vis = animator.Animator(n)
-        Graph = alg.Algorithm(epsilon, n) if not is_integral else alg.Algorithm(epsilon, n, bip_cut)
-        
-        # We apply each update to both the algorithm and the animator
-        for update in str_file[1:]:
-            operation = update[0]
-            u = int(update[1])
-            v = int(update[2])
+        for operation, u, v in updates:
             if operation == "ins":
                 Graph.insert(u, v)
                 self.vis.insert(u, v)
@@ -45,14 +84,17 @@ class GraphInput:
         #This should be edited once future algorithms are added, since not all of them compute a vertex cover.
         #vc = Graph.vertex_cover()
         #self.vis.highlight_vc(vc)
-        if is_integral:
+        if integral:
             matching = Graph.matching
             self.vis.highlight_matching(matching)
         else:
             vc = Graph.vertex_cover()
             self.vis.highlight_vc(vc)
-        
-        
+        self.vis.window.mainloop() #Keeps the window running after animation is complete
+
+
 
-g = GraphInput()
-g.vis.window.mainloop() #Keeps the window running after animation is complete
\ No newline at end of file
+headless = "--headless" in sys.argv
+options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+GraphInput([arg for arg in sys.argv[1:] if not arg.startswith("--")], headless, int(options["batch"]) if "batch" in options else None,
+           options.get("restore"), options.get("snapshot"), "--relabel" in sys.argv, "--deamortized" in sys.argv)
@@ -0,0 +1,363 @@
+import math, time
+from hopcroft_karp import HopcroftKarp
+from batching import coalesce
+from collections import defaultdict
+from dynamic_graph import DynamicGraph
+
+# The dynamic matching framework of Gupta and Peng, shared by both integral drivers. The matching is recomputed by Hopcroft-Karp on
+# a core subgraph built around a vertex cover, every e|M|/4 updates, and left alone in between. The drivers differ only in the vertex
+# cover they maintain: a subclass sets Vertex_Cover to its class, which load reads back, and builds a new one in new_vertex_cover.
+class Driver(DynamicGraph):
+
+    # With max_phases, each rebuild stops Hopcroft-Karp after that many phases. Gupta and Peng only need a (1+e)-approximate matching,
+    # which ceil(1/e) phases give.
+    # With deamortized, a rebuild is spread over the updates that follow it instead of stalling a single update; see start_rebuild.
+    # The nodes below bip_cut form the left side, so only the right side can grow past it.
+    def __init__(self, epsilon, n, bip_cut, max_phases=None, deamortized=False):
+        self.epsilon = epsilon
+        self.n = n
+        self.counter = 0
+        self.bip_cut = bip_cut
+        self.edges = [[] for i in range(n)]
+        self.pointers = [{} for i in range(n)] # Entry [u][v] points to u's position in v's adjacency list, and only exists while (u, v) is an edge
+        self.matching = {} # Maps the left endpoint of each matched edge to its right endpoint
+        self.mates = {} # Maps each matched node to its mate, so that a new matching can be swapped in by replacing both dictionaries
+        self.hk = HopcroftKarp(n)
+        self.max_phases = max_phases
+        self.deamortized = deamortized
+        self.rebuild = None # The rebuild in progress in de-amortized mode, as a generator
+        self.deleted = [] # The edges deleted since the rebuild in progress started
+        self.rebuild_work = 1 # The work done by the last de-amortized rebuild, counted in nodes and edges visited
+        self.stats = None # The work counters, see instrumentation.py
+
+        # The neighbours of v in the vertex cover come first in its adjacency list, in self.edges[v][:self.split[v]], and the others follow.
+        # The vertex cover tells us when a node joins or leaves it, and the node is then moved across the split in each of its neighbours' lists.
+        self.split = [0 for i in range(n)]
+        self.covered = [False for i in range(n)]
+        self.vc = self.new_vertex_cover(n)
+        self.vc.on_cover_change = self.cover_changed
+
+    # The vertex cover grows by itself as edges reach it.
+    def grow(self, n):
+        added = n - self.n
+        self.edges.extend([] for i in range(added))
+        self.pointers.extend({} for i in range(added))
+        self.split.extend([0] * added)
+        self.covered.extend([False] * added)
+        self.hk.grow(n)
+        self.n = n
+
+    # Swaps the entries at positions i and j of v's adjacency list.
+    def swap(self, v, i, j):
+        x = self.edges[v][i]
+        y = self.edges[v][j]
+        self.edges[v][i] = y
+        self.edges[v][j] = x
+        self.pointers[y][v] = i
+        self.pointers[x][v] = j
+
+    def insert_unilateral(self, u, v):
+        self.edges[u].append(v)
+        self.pointers[v][u] = len(self.edges[u]) - 1
+        if self.covered[v]:
+            self.swap(u, self.split[u], len(self.edges[u]) - 1)
+            self.split[u] += 1
+
+    def insert(self, u, v):
+        if self.stats != None:
+            self.stats.begin("ins")
+        self.insert_edge(u, v)
+        self.handle_counter()
+        if self.stats != None:
+            self.stats.end()
+
+    def insert_edge(self, u, v):
+        self.ensure_vertex(max(u, v))
+        self.insert_unilateral(u, v)
+        self.insert_unilateral(v, u)
+        self.vc.insert(u, v)
+
+    def delete_unilateral(self, u, v):
+        pos = self.pointers[u][v]
+        if pos < self.split[v]:
+            self.split[v] -= 1
+            self.swap(v, pos, self.split[v])
+            pos = self.split[v]
+        if pos != len(self.edges[v]) - 1:
+            self.swap(v, pos, len(self.edges[v]) - 1)
+        self.edges[v].pop()
+        del self.pointers[u][v]
+
+    # Moves v across the split in the adjacency list of each of its neighbours. This takes O(deg(v)) time.
+    def cover_changed(self, v, covered):
+        if self.covered[v] == covered:
+            return
+        self.covered[v] = covered
+        for u in self.edges[v]:
+            pos = self.pointers[v][u]
+            if covered:
+                self.swap(u, pos, self.split[u])
+                self.split[u] += 1
+            else:
+                self.split[u] -= 1
+                self.swap(u, pos, self.split[u])
+
+    def delete(self, u, v):
+        if self.stats != None:
+            self.stats.begin("del")
+        self.delete_edge(u, v)
+        self.handle_counter()
+        if self.stats != None:
+            self.stats.end()
+
+    def delete_edge(self, u, v):
+        if self.mates.get(u) == v:
+            self.unmatch(u, v)
+        if self.rebuild != None:
+            self.deleted.append((u, v))
+        self.delete_unilateral(u, v)
+        self.delete_unilateral(v, u)
+        self.vc.delete(u, v)
+
+    # Applies a batch of ("ins" or "del", u, v) updates, skipping those that cancel out within the batch.
+    # The counter still counts every update in the batch, but the matching is recomputed at most once, after the whole batch.
+    def apply_batch(self, updates):
+        if self.stats != None:
+            self.stats.begin("batch")
+        updates = list(updates)
+        for operation, u, v in coalesce(updates):
+            if operation == "ins":
+                self.insert_edge(u, v)
+            else:
+                self.delete_edge(u, v)
+        self.handle_counter(len(updates))
+        if self.stats != None:
+            self.stats.end()
+
+    # The vertex cover adds its own counters to the same object.
+    def enable_stats(self, callback=None):
+        self.vc.stats = super().enable_stats(callback)
+        return self.stats
+
+    def disable_stats(self):
+        self.stats = None
+        self.vc.stats = None
+
+    # The core subgraph holds every edge between two nodes of the vertex cover, and up to |VC|+1 edges from each node of the cover
+    # to nodes outside it. It maps each node below bip_cut to its neighbours above bip_cut, as Hopcroft-Karp expects.
+    # Since the adjacency lists are split by cover membership, these edges are read off the front of the lists of the cover nodes,
+    # in time proportional to the size of the core subgraph.
+    def get_core_subgraph(self):
+        vertex_cover = self.vc.vertex_cover
+        size = len(vertex_cover)
+        subgraph = defaultdict(list)
+        for u in vertex_cover:
+            end = self.split[u] + size + 1
+            if u < self.bip_cut:
+                subgraph[u].extend(self.edges[u][:end])
+            else:
+                for v in self.edges[u][self.split[u]:end]:
+                    subgraph[v].append(u)
+        return subgraph
+
+    # Whether the edge (u, v) is in the core subgraph, read off the positions of u and v in each other's adjacency lists.
+    def in_core_subgraph(self, u, v):
+        if self.covered[u] and self.covered[v]:
+            return True
+        size = len(self.vc.vertex_cover)
+        for x, y in [(u, v), (v, u)]:
+            if self.covered[x] and self.pointers[y][x] < self.split[x] + size + 1:
+                return True
+        return False
+
+    # The part of the current matching inside the core subgraph, from which Hopcroft-Karp starts.
+    def core_matching(self):
+        return {u: v for u, v in self.matching.items() if self.in_core_subgraph(u, v)}
+
+    def unmatch(self, u, v):
+        del self.matching[min(u, v)]
+        del self.mates[u]
+        del self.mates[v]
+
+    # Replaces the matching with one returned by Hopcroft-Karp, which maps the left endpoint of each edge to its right endpoint.
+    def set_matching(self, matching):
+        self.matching = matching
+        self.mates = {}
+        for u, v in matching.items():
+            self.mates[u] = v
+            self.mates[v] = u
+
+    def handle_counter(self, updates=1):
+        self.counter -= updates
+        if self.deamortized:
+            if self.rebuild == None and self.counter > 0:
+                return
+            if self.stats != None:
+                start = time.perf_counter_ns()
+            self.advance_rebuild(updates)
+            if self.counter <= 0:
+                self.start_rebuild()
+            if self.stats != None:
+                self.stats.count("rebuild_ns", time.perf_counter_ns() - start)
+        elif self.counter <= 0:
+            if self.stats != None:
+                start = time.perf_counter_ns()
+            subgraph = self.get_core_subgraph()
+            self.set_matching(self.hk.maximum_matching(subgraph, self.core_matching(), self.max_phases))
+            self.counter = (self.epsilon/4) * len(self.matching)
+            if self.stats != None:
+                self.stats.count("rebuilds")
+                self.stats.count("rebuild_size", sum(len(neighbours) for neighbours in subgraph.values()))
+                self.stats.count("rebuild_ns", time.perf_counter_ns() - start)
+
+    # In de-amortized mode, a rebuild is a generator that each later update advances by one slice of work.
+    # The slices are sized so that a rebuild doing as much work as the last one takes about half of the e|M|/4 updates before
+    # the next rebuild. A rebuild still running when the counter next runs out is finished on the spot.
+    # Until the new matching is swapped in, queries are answered from the old one, from which deleted edges are removed as usual.
+    def start_rebuild(self):
+        if self.rebuild != None:
+            for pause in self.rebuild:
+                pass
+        self.counter = (self.epsilon/4) * len(self.matching)
+        budget = max(1, math.ceil(2 * self.rebuild_work / max(1, self.counter)))
+        if self.stats != None:
+            self.stats.count("rebuilds")
+        self.deleted = []
+        self.rebuild = self.rebuild_steps(budget)
+        self.advance_rebuild(1)
+
+    def advance_rebuild(self, slices):
+        if self.rebuild == None:
+            return
+        if self.stats != None:
+            self.stats.count("rebuild_slices", slices)
+        for i in range(slices):
+            if next(self.rebuild, False) == False:
+                self.rebuild = None
+                return
+
+    # The steps of a de-amortized rebuild. The core subgraph is copied one cover node at a time, so it mixes edges from
+    # different updates, and the current matching, which is the warm start, is added to it. Every edge of the new matching
+    # therefore existed at some point during the rebuild, and the ones deleted since it started are dropped when it is swapped in.
+    def rebuild_steps(self, budget):
+        matching = dict(self.matching)
+        cover = list(self.vc.vertex_cover)
+        subgraph = defaultdict(list)
+        for u, v in matching.items():
+            subgraph[u].append(v)
+        work = len(matching)
+        total = 0
+        size = 0
+        for u in cover:
+            if not self.covered[u]:
+                continue
+            end = self.split[u] + len(self.vc.vertex_cover) + 1
+            if u < self.bip_cut:
+                neighbours = self.edges[u][:end]
+                subgraph[u].extend(neighbours)
+            else:
+                neighbours = self.edges[u][self.split[u]:end]
+                for v in neighbours:
+                    subgraph[v].append(u)
+            work += len(neighbours) + 1
+            size += len(neighbours)
+            if work >= budget:
+                total += work
+                work = 0
+                yield True
+        total += work
+        work = 0
+
+        yield from self.hk.search(subgraph, matching, self.max_phases, budget)
+
+        matching = self.hk.result
+        mates = {}
+        for u, v in matching.items():
+            mates[u] = v
+            mates[v] = u
+            work += 1
+            if work >= budget:
+                total += work
+                work = 0
+                yield True
+        self.rebuild_work = total + work + self.hk.work
+        if self.stats != None:
+            self.stats.count("rebuild_size", size)
+
+        # The swap. Only the buffered deletions are replayed, so this takes time proportional to their number.
+        for u, v in self.deleted:
+            x = min(u, v)
+            y = max(u, v)
+            if matching.get(x) == y and y not in self.pointers[x]:
+                del matching[x]
+                del mates[x]
+                del mates[y]
+        self.matching = matching
+        self.mates = mates
+        self.deleted = []
+
+
+    # The pointer maps, the mates and the cover flags are rebuilt from the adjacency lists, the matching and the vertex cover.
+    # A de-amortized rebuild in progress cannot be written, so it is finished first.
+    def save(self, writer, prefix=""):
+        if self.rebuild != None:
+            for pause in self.rebuild:
+                pass
+            self.rebuild = None
+        writer.scalars(prefix + "scalars", {"epsilon": self.epsilon, "n": self.n, "bip_cut": self.bip_cut, "counter": self.counter,
+                                            "max_phases": self.max_phases, "deamortized": self.deamortized, "rebuild_work": self.rebuild_work})
+        writer.ragged(prefix + "edges", self.edges)
+        writer.array(prefix + "split", self.split)
+        writer.array(prefix + "matching_left", self.matching.keys())
+        writer.array(prefix + "matching_right", self.matching.values())
+        self.vc.save(writer, prefix + "vc.")
+
+    @classmethod
+    def load(cls, snapshot, prefix=""):
+        scalars = snapshot.scalars(prefix + "scalars")
+        graph = cls(scalars["epsilon"], scalars["n"], scalars["bip_cut"], scalars["max_phases"], scalars["deamortized"])
+        graph.counter = scalars["counter"]
+        graph.rebuild_work = scalars["rebuild_work"]
+        graph.edges = snapshot.ragged(prefix + "edges")
+        for v in range(graph.n):
+            for i in range(len(graph.edges[v])):
+                graph.pointers[graph.edges[v][i]][v] = i
+        graph.split = snapshot.array(prefix + "split")
+        graph.set_matching(dict(zip(snapshot.array(prefix + "matching_left"), snapshot.array(prefix + "matching_right"))))
+        graph.vc = cls.Vertex_Cover.load(snapshot, prefix + "vc.")
+        graph.vc.on_cover_change = graph.cover_changed
+        graph.covered = [graph.vc.in_cover(v) for v in range(graph.n)]
+        return graph
+
+
+    def toString(self):
+        print(self.matching)
+        print(self.bip_cut)
+        print(len(self.matching))
+        print(self.epsilon)
+
+    # A copy of the vertex cover maintained alongside the matching.
+    def vertex_cover(self):
+        return list(self.vc.vertex_cover)
+
+    # The matching is integral, so its fractional weight is its size.
+    def matching_size(self):
+        return len(self.matching)
+
+    def fractional_weight(self):
+        return len(self.matching)
+
+    def cover_size(self):
+        return len(self.vc.vertex_cover)
+
+    def in_cover(self, v):
+        return self.vc.in_cover(v)
+
+    def mate(self, v):
+        return self.mates.get(v)
+
+    def cover_nodes(self):
+        return iter(self.vc.vertex_cover)
+
+    def matched_edges(self):
+        return iter(self.matching.items())
@@ -0,0 +1,140 @@
+import math
+
+# Hopcroft-Karp for the bipartite core subgraphs of the integral matching drivers.
+#
+# John E. Hopcroft and Richard M. Karp
+# An n^5/2 Algorithm for Maximum Matchings in Bipartite Graphs
+# SIAM Journal on Computing, 1973
+#
+# The graph is given as a dictionary mapping each left node to a list of its right neighbours, which is the form in which
+# the drivers snapshot their core subgraph. The search can start from an existing matching, in which case only the phases
+# needed to augment it are run. Every phase augments along a maximal set of vertex-disjoint shortest augmenting paths,
+# so after k phases no augmenting path of length below 2k+1 is left, and the matching is a (1+1/k)-approximation.
+# Stopping after ceil(1/e) phases therefore gives a (1+e)-approximate maximum matching.
+# The search can also run as a generator that pauses after every slice of work, so that it can be spread over many updates.
+
+INFINITY = math.inf
+
+
+class HopcroftKarp:
+    # The working arrays are indexed by node and allocated once. Each search only resets the entries it touched.
+    def __init__(self, n):
+        self.mate = [None for i in range(n)]
+        self.dist = [INFINITY for i in range(n)]
+        self.next = [0 for i in range(n)] # Entry [u] is the position in u's neighbour list where the search of u resumes
+        self.phases = 0 # The number of phases run by the last search
+        self.work = 0 # The work done by the last search, counted in nodes and edges visited
+
+    # Makes room for n nodes, for graphs whose vertex set grows.
+    def grow(self, n):
+        added = n - len(self.mate)
+        self.mate.extend([None] * added)
+        self.dist.extend([INFINITY] * added)
+        self.next.extend([0] * added)
+
+    # Returns a maximum matching of the graph, as a dictionary mapping left nodes to right nodes, starting from the given matching.
+    # Every edge of the starting matching must be in the graph. With max_phases, the search stops after that many phases.
+    def maximum_matching(self, graph, matching=None, max_phases=None):
+        for pause in self.search(graph, matching, max_phases):
+            pass
+        return self.result
+
+
+    # The search behind maximum_matching, as a generator. With a budget, it pauses whenever it has done about that much work,
+    # counted in nodes and edges visited, since the last pause. Pauses happen between steps of the searches, so a slice only overruns
+    # the budget by the length of one adjacency list. When the generator is exhausted, the matching is in self.result.
+    # Only one search may be in progress at a time.
+    def search(self, graph, matching=None, max_phases=None, budget=None):
+        mate = self.mate
+        dist = self.dist
+        next = self.next
+        if matching != None:
+            for u, v in matching.items():
+                mate[u] = v
+                mate[v] = u
+        left = list(graph)
+        self.phases = 0
+        self.work = 0
+        work = 0
+        while max_phases == None or self.phases < max_phases:
+
+            # The breadth-first search. The free left nodes form layer 0, and the mate of a right node adjacent to layer i joins layer i+1.
+            # It stops at the first layer adjacent to a free right node, which is where the shortest augmenting paths end.
+            queue = []
+            for u in left:
+                next[u] = 0
+                if mate[u] == None:
+                    dist[u] = 0
+                    queue.append(u)
+                else:
+                    dist[u] = INFINITY
+            work += len(left)
+            free_layer = INFINITY
+            for u in queue:
+                if dist[u] >= free_layer:
+                    break
+                for v in graph[u]:
+                    w = mate[v]
+                    if w == None:
+                        free_layer = dist[u]
+                    elif dist[w] == INFINITY:
+                        dist[w] = dist[u] + 1
+                        queue.append(w)
+                work += len(graph[u]) + 1
+                if budget != None and work >= budget:
+                    self.work += work
+                    work = 0
+                    yield True
+            if free_layer == INFINITY:
+                break
+            self.phases += 1
+
+            # The depth-first search from each free left node, along the layers. It is iterative, so long augmenting paths cannot exhaust
+            # the recursion limit. Each node resumes scanning its neighbours where it last stopped, and a node with no way forward
+            # is removed from the layers, so a phase takes time linear in the graph.
+            for root in left:
+                if mate[root] != None:
+                    continue
+                path = [root] # Left nodes, each the mate of the right node chosen by the previous one
+                chosen = [] # Right nodes, chosen[i] being the neighbour of path[i] the path goes through
+                while len(path) != 0:
+                    u = path[-1]
+                    neighbours = graph[u]
+                    advanced = False
+                    while next[u] < len(neighbours):
+                        v = neighbours[next[u]]
+                        next[u] += 1
+                        work += 1
+                        w = mate[v]
+                        if w == None:
+                            if dist[u] == free_layer:
+                                chosen.append(v)
+                                for i in range(len(path)):
+                                    mate[path[i]] = chosen[i]
+                                    mate[chosen[i]] = path[i]
+                                path = []
+                                advanced = True
+                                break
+                        elif dist[w] == dist[u] + 1:
+                            chosen.append(v)
+                            path.append(w)
+                            advanced = True
+                            break
+                    if not advanced:
+                        dist[u] = INFINITY
+                        path.pop()
+                        if len(chosen) != 0:
+                            chosen.pop()
+                    if budget != None and work >= budget:
+                        self.work += work
+                        work = 0
+                        yield True
+
+        self.work += work
+        self.result = {}
+        for u in left:
+            v = mate[u]
+            if v != None:
+                self.result[u] = v
+                mate[u] = None
+                mate[v] = None
@@ -0,0 +1,85 @@
+import json, time
+
+# Per-update work counters for the algorithms.
+#
+# Every algorithm has a stats attribute, which is None until enable_stats is called on it. Each instrumented step is guarded by
+# a test of stats against None, so an instance without stats pays one attribute test per step and allocates nothing.
+# The algorithms only call begin, count, peak and end on the stats object, so any object with these four methods can be assigned
+# to the stats attribute in place of a Stats.
+#
+# The counters used are:
+#   level_ups, level_downs    levels changed by fractionalalgo1's dirty-node handler
+#   neighbours_touched        neighbours visited while changing levels or searching for a free neighbour
+#   dirty_nodes               the longest the queue of dirty nodes got during the update
+#   surrogates, aug_paths     calls to surrogate and aug_path in integral_matching_1's vertex cover
+#   free_searches             searches for a mate by a node that was freed
+#   rebuilds                  rebuilds started, by fractionalalgo2 or by the integral drivers
+#   rebuild_size              edges in the rebuilt part of the graph, or in the core subgraph
+#   rebuild_slices            slices of de-amortized rebuilds run during the update
+#   rebuild_ns                time spent rebuilding, in nanoseconds
+#   duration_ns               time taken by the whole update, in nanoseconds
+
+
+class Stats:
+
+    # With a callback, callback(operation, counters) is called at the end of every update, with "ins", "del" or "batch"
+    # as the operation and a dictionary of the counters of that update. The dictionary is not reused.
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.updates = 0
+        self.operation = None
+        self.current = {}
+        self.start = 0
+        self.totals = {} # The sum of each counter over all updates
+        self.maxima = {} # The largest value of each counter in a single update
+        self.histograms = {} # Entry [name][i] counts the updates in which the counter had bit length i, i.e. was in [2^(i-1), 2^i)
+
+
+    def begin(self, operation):
+        self.operation = operation
+        self.current = {}
+        self.start = time.perf_counter_ns()
+
+
+    def count(self, name, amount=1):
+        self.current[name] = self.current.get(name, 0) + amount
+
+
+    # Records value if it is the largest seen for the counter during this update.
+    def peak(self, name, value):
+        if value > self.current.get(name, 0):
+            self.current[name] = value
+
+
+    def end(self):
+        current = self.current
+        current["duration_ns"] = time.perf_counter_ns() - self.start
+        self.updates += 1
+        for name, value in current.items():
+            self.totals[name] = self.totals.get(name, 0) + value
+            if value > self.maxima.get(name, 0):
+                self.maxima[name] = value
+            histogram = self.histograms.setdefault(name, [])
+            bucket = int(value).bit_length()
+            while len(histogram) <= bucket:
+                histogram.append(0)
+            histogram[bucket] += 1
+        if self.callback != None:
+            self.callback(self.operation, current)
+
+
+    # The aggregates as a dictionary, ready to be written as JSON.
+    # Updates in which a counter stayed at zero do not appear in its histogram.
+    def summary(self):
+        return {"updates": self.updates, "totals": self.totals, "maxima": self.maxima,
+                "means": {name: total / self.updates for name, total in self.totals.items()},
+                "histograms": self.histograms}
+
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=1)
+
+
+    def export(self, path):
+        with open(path, "w") as file:
+            file.write(self.to_json())
@@ -0,0 +1,99 @@
+import sys, time, asyncio
+from server import PORT
+from update_stream import open_updates
+from workloads import WORKLOADS
+from benchmark import percentile
+
+# Generates load for server.py, for local testing.
+#
+# Usage: python load_client.py [<update file>] [--socket=<path>] [--port=7344] [--connections=4] [--query_interval=1]
+#                              [--model=uniform] [--n=1000] [--bip_cut=0] [--updates=100000] [--seed=0]
+#
+# The updates are read from the update file, or generated from the workload model when no file is given. The server must have been started
+# with the same bipartition, or the updates are rejected. They are split between the connections by edge, so that every update
+# of an edge goes through the same connection and the updates of each edge reach the server in order.
+# Each connection writes its updates without waiting for replies, and syncs at the end. The throughput is measured up to the last sync.
+# Meanwhile one more connection asks queries, alternating between cover, mate and size, one every --query_interval milliseconds,
+# and times their round trips. Queries are answered between batches without waiting for the queued updates, so even with updates
+# arriving faster than the server applies them, their latency stays within a few batches, which a smaller --batch on the server shortens.
+
+QUERIES = ["cover", "mate", "size"]
+
+
+async def connect(options):
+    if "socket" in options:
+        return await asyncio.open_unix_connection(options["socket"])
+    return await asyncio.open_connection("127.0.0.1", int(options.get("port", PORT)))
+
+
+# Sends the updates over one connection.
+async def send(options, updates):
+    reader, writer = await connect(options)
+    for i in range(len(updates)):
+        writer.write("{} {} {}\n".format(*updates[i]).encode())
+        if i % 64 == 63:
+            await writer.drain()
+    writer.write(b"sync\n")
+    await writer.drain()
+    await reader.readline()
+    writer.close()
+    await writer.wait_closed()
+
+
+# Asks queries about the nodes of the updates until done is set, and appends the latency of each to latencies, in nanoseconds.
+async def ask(options, updates, interval, done, latencies):
+    reader, writer = await connect(options)
+    i = 0
+    while not done.is_set():
+        query = QUERIES[i % len(QUERIES)]
+        if query != "size":
+            query = "{} {}".format(query, updates[i % len(updates)][1])
+        before = time.perf_counter_ns()
+        writer.write(query.encode() + b"\n")
+        await writer.drain()
+        reply = await reader.readline()
+        latencies.append(time.perf_counter_ns() - before)
+        if reply.startswith(b"error"):
+            raise ValueError(reply.decode().strip())
+        i += 1
+        await asyncio.sleep(interval)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run(options, updates):
+    connections = int(options.get("connections", 4))
+    interval = float(options.get("query_interval", 1)) / 1000
+    shares = [[] for i in range(connections)]
+    for operation, u, v in updates:
+        shares[hash((min(u, v), max(u, v))) % connections].append((operation, u, v))
+    latencies = []
+    done = asyncio.Event()
+    queries = asyncio.create_task(ask(options, updates, interval, done, latencies))
+    start = time.perf_counter()
+    await asyncio.gather(*[send(options, share) for share in shares])
+    elapsed = time.perf_counter() - start
+    done.set()
+    await queries
+
+    latencies.sort()
+    print("{} updates over {} connections in {:.3f}s ({:.0f} updates/s)".format(len(updates), connections, elapsed, len(updates) / elapsed if elapsed > 0 else 0))
+    print("{} queries, p50 {:.1f} us, p99 {:.1f} us, max {:.1f} us".format(len(latencies), percentile(latencies, 50) / 1000,
+                                                                          percentile(latencies, 99) / 1000, (latencies[-1] if latencies else 0) / 1000))
+    reader, writer = await connect(options)
+    writer.write(b"stats\n")
+    await writer.drain()
+    print("server:", (await reader.readline()).decode().strip())
+    writer.close()
+    await writer.wait_closed()
+
+
+if __name__ == "__main__":
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(args) != 0:
+        updates = list(open_updates(args[0])[3])
+    else:
+        workload = WORKLOADS[options.get("model", "uniform")](int(options.get("n", 1000)), int(options.get("bip_cut", 0)), int(options.get("seed", 0)))
+        updates = list(workload.updates(int(options.get("updates", 100000))))
+    asyncio.run(run(options, updates))
@@ -0,0 +1,48 @@
+import sys, random, tracemalloc
+from algorithms import ALGORITHMS, create_algorithm, is_integral
+
+# Measures the memory footprint of an algorithm on a random sparse graph.
+# Usage: python memory_benchmark.py <algorithm|all> <n> <number_of_edges> [epsilon]
+# The footprint is reported twice: straight after construction, and after the edges have been inserted.
+
+
+# Draws m distinct random edges. For the integral algorithms the edges cross the bipartition at bip_cut.
+def random_edges(n, m, bip_cut, seed=0):
+    rand = random.Random(seed)
+    edges = set()
+    while len(edges) < m:
+        if bip_cut:
+            edge = (rand.randrange(bip_cut), rand.randrange(bip_cut, n))
+        else:
+            u, v = rand.sample(range(n), 2)
+            edge = (min(u, v), max(u, v))
+        edges.add(edge)
+    return edges
+
+
+def measure(name, n, m, epsilon):
+    bip_cut = n // 2 if is_integral(name) else 0
+    edges = random_edges(n, m, bip_cut)
+    tracemalloc.start()
+    Graph = create_algorithm(name, epsilon, n, bip_cut)
+    constructed = tracemalloc.get_traced_memory()[0]
+    for u, v in edges:
+        Graph.insert(u, v)
+    loaded, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return constructed, loaded, peak
+
+
+def report(name, n, m, epsilon):
+    constructed, loaded, peak = measure(name, n, m, epsilon)
+    mib = 1024 * 1024
+    print("{:<12} n={:<8} m={:<8} construction {:>9.2f} MiB   with edges {:>9.2f} MiB   peak {:>9.2f} MiB".format(name, n, m, constructed / mib, loaded / mib, peak / mib))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[2])
+    m = int(sys.argv[3])
+    epsilon = float(sys.argv[4]) if len(sys.argv) > 4 else 0.1
+    names = ALGORITHMS if sys.argv[1] == "all" else [sys.argv[1]]
+    for name in names:
+        report(name, n, m, epsilon)
@@ -0,0 +1,211 @@
+import sys, json, asyncio, signal
+from algorithms import ALGORITHMS, create_algorithm, restore_algorithm, is_integral
+from snapshot import SnapshotWriter, Snapshot, snapshot_position
+
+# Runs an algorithm as a long-lived local service.
+#
+# Usage: python server.py <algorithm> [--epsilon=0.1] [--n=1] [--bip_cut=0] [--socket=<path>] [--port=7344] [--batch=256] [--queue=4096]
+#                         [--restore=<snapshot>] [--snapshot=<snapshot>] [--deamortized]
+#
+# Clients connect over a Unix socket at --socket, or over TCP on localhost at --port, and send one command per line:
+#   ins u v, del u v    an update, which gets no reply
+#   cover v             1 if v is in the vertex cover, 0 otherwise
+#   mate v              the mate of v in the matching, or - if v is free
+#   size                the size of the matching
+#   sync                waits until every update the connection sent before it has been applied, and replies with the number of updates applied
+#   stats               the counters of the server, as a JSON object
+# Malformed lines are answered with a line starting with "error". Updates that do not fit the graph, i.e. self-loops, edges within one side
+# of the bipartition, insertions of edges that are present and deletions of edges that are not, are dropped and counted as rejected,
+# since the algorithms assume they never happen. The integral drivers need --bip_cut, like in the update files, and with --deamortized
+# they spread each rebuild over the updates after it, so that no single batch stalls the queries behind it.
+#
+# The algorithm has a single writer. Every connection puts its updates into one bounded queue, and a writer task takes whatever is
+# waiting, up to --batch updates, and applies it with apply_batch. apply_batch runs on the event loop, so queries are answered between batches,
+# from the state after the last whole batch. Queries do not go through the queue, so they never wait for the updates queued ahead of them,
+# and sync is there for clients that want to read their own writes. When the queue is full, connections stop reading from their sockets
+# until the writer has caught up, which holds the clients back through the socket buffers.
+# On SIGINT or SIGTERM, the server stops accepting connections and reading updates, applies the updates already queued, writes the snapshot
+# if --snapshot was given, and exits. The snapshot holds the edge set next to the algorithm's own sections, since the server needs it
+# to check updates after a restart from --restore. graph_input.py can restore the algorithm from it too.
+
+PORT = 7344
+
+
+class UpdateServer:
+    def __init__(self, name, epsilon=0.1, n=1, bip_cut=0, batch=256, queue=4096, restore=None, snapshot=None, deamortized=False):
+        self.snapshot = snapshot
+        self.batch = batch
+        self.queue_size = queue
+        self.integral = is_integral(name)
+        self.edges = set() # The edges of the graph once every update taken from the queue is applied, as (min, max) pairs
+        self.applied = 0 # The number of updates taken from the queue, counting the rejected ones
+        if restore:
+            self.Graph = restore_algorithm(name, restore)
+            self.applied = snapshot_position(restore)
+            self.load_edges(restore)
+        else:
+            if ALGORITHMS[name][0].startswith("integral") and not bip_cut:
+                raise ValueError("{} needs --bip_cut".format(name))
+            self.Graph = create_algorithm(name, epsilon, n, bip_cut, deamortized)
+        self.bip_cut = getattr(self.Graph, "bip_cut", 0)
+        self.queued = self.applied # The sequence number of the last update put into the queue
+        self.rejected = 0
+        self.batches = 0
+        self.queries = 0
+
+
+    # Listens on a Unix socket if path is given, and on a local TCP port otherwise, until a signal arrives or the writer fails.
+    async def serve(self, path=None, port=PORT):
+        loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(self.queue_size)
+        self.applied_event = asyncio.Event() # Set, and replaced, after every batch
+        self.connections = set()
+        stopping = asyncio.Event()
+        for signum in [signal.SIGINT, signal.SIGTERM]:
+            loop.add_signal_handler(signum, stopping.set)
+        if path:
+            server = await asyncio.start_unix_server(self.handle, path)
+        else:
+            server = await asyncio.start_server(self.handle, "127.0.0.1", port)
+        print("serving on", path if path else "127.0.0.1:{}".format(port), flush=True)
+
+        writer = asyncio.create_task(self.write())
+        stop = asyncio.create_task(stopping.wait())
+        await asyncio.wait([writer, stop], return_when=asyncio.FIRST_COMPLETED)
+
+        # Shuts down: no new connections or updates are taken, and the writer drains the queue before the state is saved.
+        server.close()
+        for task in self.connections:
+            task.cancel()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await server.wait_closed()
+        if not writer.done():
+            await self.queue.join()
+            writer.cancel()
+        stop.cancel()
+        if writer.done() and not writer.cancelled():
+            writer.result() # Raises whatever stopped the writer
+        if self.snapshot:
+            self.save_snapshot(self.snapshot)
+        print(json.dumps(self.counters()), flush=True)
+
+
+    # Serves one connection. sent is the sequence number of the last update it put into the queue.
+    async def handle(self, reader, writer):
+        self.connections.add(asyncio.current_task())
+        sent = 0
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").split()
+                if len(command) == 0:
+                    continue
+                try:
+                    if command[0] in ["ins", "del"] and len(command) == 3:
+                        await self.queue.put((command[0], int(command[1]), int(command[2])))
+                        self.queued += 1
+                        sent = self.queued
+                        continue
+                    reply = await self.query(command, sent)
+                except ValueError:
+                    reply = "error: cannot parse {!r}".format(line.decode(errors="replace").strip())
+                writer.write(reply.encode() + b"\n")
+                await writer.drain()
+        except (asyncio.CancelledError, ConnectionError):
+            pass
+        finally:
+            self.connections.discard(asyncio.current_task())
+            writer.close()
+
+
+    # Answers a query from the current state, which is that after the last batch.
+    async def query(self, command, sent):
+        self.queries += 1
+        if command[0] == "sync" and len(command) == 1:
+            while self.applied < sent:
+                await self.applied_event.wait()
+            return str(self.applied)
+        if command[0] == "size" and len(command) == 1:
+            return str(self.Graph.matching_size())
+        if command[0] == "stats" and len(command) == 1:
+            return json.dumps(self.counters())
+        if command[0] in ["cover", "mate"] and len(command) == 2:
+            v = int(command[1])
+            if v < 0 or v >= self.Graph.n:
+                return "0" if command[0] == "cover" else "-"
+            if command[0] == "cover":
+                return "1" if self.Graph.in_cover(v) else "0"
+            mate = self.Graph.mate(v)
+            return "-" if mate == None else str(mate)
+        raise ValueError(command)
+
+
+    # The single writer. Once an update is waiting, it takes every update queued behind it, up to the batch size, and applies them together.
+    # It yields to the event loop after each batch, so that connections and queries are served even while the queue stays full.
+    async def write(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            updates = [update for update in batch if self.accept(*update)]
+            if len(updates) != 0:
+                self.Graph.apply_batch(updates)
+            self.applied += len(batch)
+            self.rejected += len(batch) - len(updates)
+            self.batches += 1
+            for update in batch:
+                self.queue.task_done()
+            self.applied_event.set()
+            self.applied_event = asyncio.Event()
+            await asyncio.sleep(0)
+
+
+    # Checks an update against the edge set, in queue order, and applies it to the edge set if it fits.
+    def accept(self, operation, u, v):
+        if u < 0 or v < 0 or u == v or (self.bip_cut and (u < self.bip_cut) == (v < self.bip_cut)):
+            return False
+        edge = (u, v) if u < v else (v, u)
+        if operation == "ins":
+            if edge in self.edges:
+                return False
+            self.edges.add(edge)
+        else:
+            if edge not in self.edges:
+                return False
+            self.edges.remove(edge)
+        return True
+
+
+    def counters(self):
+        return {"applied": self.applied, "rejected": self.rejected, "batches": self.batches, "queries": self.queries,
+                "queued": self.queue.qsize(), "edges": len(self.edges), "result_size": self.Graph.matching_size() if self.integral else self.Graph.cover_size()}
+
+
+    # Writes the algorithm's state like write_snapshot does, followed by the edge set. The position is the number of updates taken from the queue.
+    def save_snapshot(self, path):
+        writer = SnapshotWriter(path)
+        writer.scalars("snapshot", {"class": type(self.Graph).__module__ + "." + type(self.Graph).__name__, "position": self.applied})
+        self.Graph.save(writer)
+        writer.array("server.edges_u", [edge[0] for edge in self.edges])
+        writer.array("server.edges_v", [edge[1] for edge in self.edges])
+        writer.close()
+
+
+    def load_edges(self, path):
+        snapshot = Snapshot(path)
+        try:
+            if "server.edges_u" not in snapshot.sections:
+                raise ValueError("{} holds no edge set, so it was not written by server.py".format(path))
+            self.edges = set(zip(snapshot.array("server.edges_u"), snapshot.array("server.edges_v")))
+        finally:
+            snapshot.close()
+
+
+if __name__ == "__main__":
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    server = UpdateServer(args[0], float(options.get("epsilon", 0.1)), int(options.get("n", 1)), int(options.get("bip_cut", 0)),
+                          int(options.get("batch", 256)), int(options.get("queue", 4096)), options.get("restore"), options.get("snapshot"), "--deamortized" in sys.argv)
+    asyncio.run(server.serve(options.get("socket"), int(options.get("port", PORT))))
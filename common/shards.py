@@ -0,0 +1,249 @@
+import sys, os, time, random, shutil, tempfile, multiprocessing
+from algorithms import load_algorithm, is_integral, result_size
+from snapshot import SnapshotWriter, Snapshot
+from workloads import WORKLOADS
+
+# Maintains many small independent graphs, one algorithm instance each, spread over a pool of worker processes.
+#
+# Usage: python shards.py <algorithm> [--graphs=1000] [--n=50] [--updates=200000] [--workers=1,2,4] [--epsilon=0.1] [--batch=64]
+#                         [--message=1024] [--model=uniform] [--skew=3] [--seed=0]
+# measures the throughput of the engine with each number of workers, on updates spread over the graphs with the given skew.
+#
+# Every graph belongs to one of a fixed number of shards, by the hash of its id, and every shard to one worker. Routing only happens in the
+# parent, so the randomized hashing of strings does not matter. The parent holds back the updates of each graph until --batch of them
+# have gathered, and then queues them for the graph's worker, which applies them with a single apply_batch. The queued batches of a worker
+# are sent as one message once they hold --message updates. Since the batches are cut per graph, and every flush happens at the same point
+# of the update stream whatever the number of workers, each graph goes through the same apply_batch calls, and ends in the same state,
+# with any number of workers.
+# Graphs are created on their first update with a single node and grow with the ids they see, see ensure_vertex, so small graphs stay small.
+# Queries flush the buffers first, and since each worker handles its messages in order, the answers reflect every update made before them.
+#
+# rebalance moves shards from the busiest worker to the least busy one, judged by the updates routed to each shard since the last rebalance.
+# A moving shard is written by its old worker to a snapshot file, holding every graph of the shard under its own prefix, and read back
+# by its new worker. A single hot graph cannot be split, so the balance is only as good as the shards allow.
+
+DEFAULTS = {"graphs": "1000", "n": "50", "updates": "200000", "workers": "1,2,4", "epsilon": "0.1", "batch": "64", "message": "1024", "model": "uniform", "skew": "3", "seed": "0"}
+
+
+class ShardedEngine:
+    # bip_cut is passed on to every graph, which the integral drivers need.
+    def __init__(self, name, epsilon, workers=None, bip_cut=0, shards=256, batch=64, message=1024):
+        self.name = name
+        self.shards = shards
+        self.batch = batch
+        self.message = message
+        self.workers = workers if workers else len(os.sched_getaffinity(0))
+        self.assignment = [shard % self.workers for shard in range(shards)] # The worker each shard lives on
+        self.load = [0 for i in range(shards)] # The updates routed to each shard since the last rebalance
+        self.pending = {} # Maps each graph id to its shard and the updates held back for it, as (operation, u, v)
+        self.buffers = [[] for i in range(self.workers)] # The batches waiting to be sent to each worker, as (shard, graph_id, updates)
+        self.buffered = [0 for i in range(self.workers)] # The number of updates in each buffer
+        self.directory = tempfile.mkdtemp()
+        self.results = multiprocessing.Queue()
+        self.tasks = [multiprocessing.Queue() for i in range(self.workers)]
+        self.processes = [multiprocessing.Process(target=serve, args=(name, epsilon, bip_cut, self.tasks[i], self.results), daemon=True)
+                          for i in range(self.workers)]
+        for process in self.processes:
+            process.start()
+
+
+    def update(self, graph_id, operation, u, v):
+        if graph_id not in self.pending:
+            self.pending[graph_id] = (hash(graph_id) % self.shards, [])
+        shard, updates = self.pending[graph_id]
+        self.load[shard] += 1
+        updates.append((operation, u, v))
+        if len(updates) >= self.batch:
+            del self.pending[graph_id]
+            self.queue_batch(shard, graph_id, updates)
+
+    # Adds a batch of one graph to the buffer of its worker, and sends the buffer once it is full.
+    def queue_batch(self, shard, graph_id, updates):
+        worker = self.assignment[shard]
+        self.buffers[worker].append((shard, graph_id, updates))
+        self.buffered[worker] += len(updates)
+        if self.buffered[worker] >= self.message:
+            self.send(worker)
+
+    def send(self, worker):
+        self.tasks[worker].put(("updates", self.buffers[worker]))
+        self.buffers[worker] = []
+        self.buffered[worker] = 0
+
+    # Applies an iterable of (graph_id, operation, u, v) updates.
+    def apply(self, updates):
+        for graph_id, operation, u, v in updates:
+            self.update(graph_id, operation, u, v)
+
+    # Cuts the batches of every graph short, and sends them.
+    def flush(self):
+        for graph_id, (shard, updates) in self.pending.items():
+            self.queue_batch(shard, graph_id, updates)
+        self.pending = {}
+        for worker in range(self.workers):
+            if len(self.buffers[worker]) != 0:
+                self.send(worker)
+
+
+    # The size of the solution of one graph: its matching for the integral algorithms, its vertex cover otherwise. None if it has no updates yet.
+    def result(self, graph_id):
+        self.flush()
+        shard = hash(graph_id) % self.shards
+        self.tasks[self.assignment[shard]].put(("result", shard, graph_id))
+        return self.reply()
+
+    # The number of graphs and updates, and the total size of the solutions, over every worker.
+    def aggregate(self):
+        self.flush()
+        for tasks in self.tasks:
+            tasks.put(("summary",))
+        total = {"graphs": 0, "updates": 0, "result_size": 0}
+        for worker in range(self.workers):
+            summary = self.reply()
+            for key in total:
+                total[key] += summary[key]
+        return total
+
+
+    # Moves shards off the busiest worker while that lowers the highest load, and returns the moves as (shard, old worker, new worker).
+    # Each move takes the busiest shard that is lighter than the gap between the busiest and least busy worker.
+    # The buffers are flushed even if nothing moves, so that the batches do not depend on the moves.
+    def rebalance(self):
+        self.flush()
+        loads = [0 for i in range(self.workers)]
+        for shard in range(self.shards):
+            loads[self.assignment[shard]] += self.load[shard]
+        moves = []
+        for attempt in range(self.shards):
+            hot = loads.index(max(loads))
+            cold = loads.index(min(loads))
+            candidates = [shard for shard in range(self.shards) if self.assignment[shard] == hot and 0 < self.load[shard] < loads[hot] - loads[cold]]
+            if len(candidates) == 0:
+                break
+            shard = max(candidates, key=lambda shard: self.load[shard])
+            self.move(shard, cold)
+            loads[hot] -= self.load[shard]
+            loads[cold] += self.load[shard]
+            moves.append((shard, hot, cold))
+        self.load = [0 for i in range(self.shards)]
+        return moves
+
+    # The old worker has written the shard before the new one is told to read it, and the updates routed afterwards reach the new worker behind it.
+    # Nothing is held back for the shard, since rebalance has just flushed the buffers.
+    def move(self, shard, worker):
+        path = os.path.join(self.directory, "shard{}.snapshot".format(shard))
+        self.tasks[self.assignment[shard]].put(("export", shard, path))
+        self.reply()
+        self.assignment[shard] = worker
+        self.tasks[worker].put(("import", shard, path))
+
+
+    # The next reply of a worker. A worker that failed sends its traceback instead, and stops.
+    def reply(self):
+        status, value = self.results.get()
+        if status == "error":
+            raise RuntimeError("a shard worker failed:\n" + value)
+        return value
+
+
+    def close(self):
+        self.flush()
+        for tasks in self.tasks:
+            tasks.put(None)
+        for process in self.processes:
+            process.join()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+# The body of a worker process. graphs maps each shard held by the worker to a dictionary from graph ids to algorithm instances.
+# The algorithm's module is imported once, and new graphs are built from its class like create_algorithm does.
+def serve(name, epsilon, bip_cut, tasks, results):
+    import traceback
+    Algorithm = load_algorithm(name).Algorithm
+    integral = is_integral(name)
+    graphs = {}
+    updates = 0
+    try:
+        for task in iter(tasks.get, None):
+            if task[0] == "updates":
+                for shard, graph_id, batch in task[1]:
+                    shard_graphs = graphs.setdefault(shard, {})
+                    if graph_id not in shard_graphs:
+                        shard_graphs[graph_id] = Algorithm(epsilon, 1, bip_cut) if integral else Algorithm(epsilon, 1)
+                    shard_graphs[graph_id].apply_batch(batch)
+                    updates += len(batch)
+            elif task[0] == "result":
+                Graph = graphs.get(task[1], {}).get(task[2])
+                results.put(("ok", result_size(Graph, integral) if Graph != None else None))
+            elif task[0] == "summary":
+                results.put(("ok", {"graphs": sum(len(shard_graphs) for shard_graphs in graphs.values()), "updates": updates,
+                                    "result_size": sum(result_size(Graph, integral) for shard_graphs in graphs.values() for Graph in shard_graphs.values())}))
+            elif task[0] == "export":
+                export_shard(graphs.pop(task[1], {}), task[2])
+                results.put(("ok", None))
+            elif task[0] == "import":
+                graphs[task[1]] = import_shard(Algorithm, task[2])
+                os.remove(task[2])
+    except Exception:
+        results.put(("error", traceback.format_exc()))
+
+
+# Writes the graphs of a shard to one snapshot file. Graph ids are written as JSON, so they must be integers or strings. The i-th graph is saved under the prefix "i.".
+def export_shard(shard_graphs, path):
+    writer = SnapshotWriter(path)
+    writer.scalars("shard", {"graphs": list(shard_graphs)})
+    for i, Graph in enumerate(shard_graphs.values()):
+        Graph.save(writer, "{}.".format(i))
+    writer.close()
+
+
+def import_shard(Algorithm, path):
+    snapshot = Snapshot(path)
+    try:
+        graph_ids = snapshot.scalars("shard")["graphs"]
+        return {graph_id: Algorithm.load(snapshot, "{}.".format(i)) for i, graph_id in enumerate(graph_ids)}
+    finally:
+        snapshot.close()
+
+
+# Draws the updates of a benchmark run. Each graph has its own workload, and graph i is picked with probability decreasing in i,
+# more steeply for a larger skew, so that the first graphs are hot.
+def tenant_updates(options, bip_cut):
+    graphs = int(options["graphs"])
+    n = int(options["n"])
+    seed = int(options["seed"])
+    skew = float(options["skew"])
+    rand = random.Random(seed)
+    workloads = {}
+    updates = []
+    for i in range(int(options["updates"])):
+        graph_id = int(graphs * rand.random() ** skew)
+        if graph_id not in workloads:
+            workloads[graph_id] = WORKLOADS[options["model"]](n, bip_cut, seed + graph_id)
+        updates.append((graph_id,) + workloads[graph_id].next_update())
+    return updates
+
+
+def benchmark(name, options):
+    n = int(options["n"])
+    bip_cut = n // 2 if is_integral(name) else 0
+    updates = tenant_updates(options, bip_cut)
+    half = len(updates) // 2
+    print("{:>8} {:>12} {:>10} {:>8} {:>10} {:>8}".format("workers", "updates/s", "elapsed s", "graphs", "size", "moves"))
+    for workers in [int(value) for value in options["workers"].split(",")]:
+        engine = ShardedEngine(name, float(options["epsilon"]), workers, bip_cut, batch=int(options["batch"]), message=int(options["message"]))
+        start = time.perf_counter()
+        engine.apply(updates[:half])
+        moves = engine.rebalance()
+        engine.apply(updates[half:])
+        total = engine.aggregate()
+        elapsed = time.perf_counter() - start
+        engine.close()
+        print("{:>8} {:>12.0f} {:>10.3f} {:>8} {:>10} {:>8}".format(workers, len(updates) / elapsed, elapsed, total["graphs"], total["result_size"], len(moves)))
+
+
+if __name__ == "__main__":
+    options = dict(DEFAULTS)
+    options.update(dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--")))
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    benchmark(args[0], options)
@@ -0,0 +1,163 @@
+import sys, mmap, struct, json
+from array import array
+
+# A binary format for snapshots of algorithm state, read back through a memory map.
+#
+# The file starts with a 16 byte header: the magic bytes, a format version, the byte order of the machine that wrote it
+# (1 for little-endian) and the number of sections. Each section has a 64 byte header, holding its name, its type and the length
+# of its payload in bytes, followed by the payload, padded to a multiple of 8 bytes. The type is "j" for a JSON object of scalars,
+# or an array typecode, "q" for signed 64 bit integers and "d" for doubles, for a flat array in the byte order of the header.
+# A list of lists is stored as the concatenation of the lists, in a section of its own, and the offsets at which each list starts
+# and the last one ends, in a section named "<name>.offsets". A list of lists of lists adds the offsets of each group of lists,
+# in a section named "<name>.groups". In the integer arrays, -1 stands for None.
+#
+# Arrays are decoded by casting a memoryview of the map, so restoring takes time linear in the size of the snapshot.
+# Each algorithm writes its state with save(writer, prefix) and reads it back with the class method load(snapshot, prefix),
+# leaving out whatever can be rebuilt from the rest, such as the pointer maps, which are rebuilt from the lists they point into.
+# The prefix keeps apart the sections of the helpers an algorithm holds, such as its vertex cover.
+
+MAGIC = b"DGSS"
+VERSION = 1
+HEADER = struct.Struct("<4sHBxQ")
+SECTION = struct.Struct("<54sccQ")
+
+
+class SnapshotWriter:
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.count = 0
+        self.file.write(HEADER.pack(MAGIC, VERSION, sys.byteorder == "little", 0))
+
+    def section(self, name, type, payload):
+        data = memoryview(payload).cast("B")
+        self.file.write(SECTION.pack(name.encode(), type.encode(), b"\0", len(data)))
+        self.file.write(data)
+        self.file.write(bytes(-len(data) % 8))
+        self.count += 1
+
+    def scalars(self, name, values):
+        self.section(name, "j", json.dumps(values).encode())
+
+    def array(self, name, values, typecode="q"):
+        if typecode == "q":
+            values = [-1 if value is None else value for value in values]
+        self.section(name, typecode, array(typecode, values))
+
+    def ragged(self, name, lists, typecode="q"):
+        flat = array(typecode)
+        offsets = array("q", [0])
+        for values in lists:
+            flat.extend(values)
+            offsets.append(len(flat))
+        self.section(name, typecode, flat)
+        self.section(name + ".offsets", "q", offsets)
+
+    def nested(self, name, groups, typecode="q"):
+        offsets = array("q", [0])
+        for lists in groups:
+            offsets.append(offsets[-1] + len(lists))
+        self.ragged(name, (values for lists in groups for values in lists), typecode)
+        self.section(name + ".groups", "q", offsets)
+
+    # Writes the number of sections into the header.
+    def close(self):
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, sys.byteorder == "little", self.count))
+        self.file.close()
+
+
+class Snapshot:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, little, count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not a version {} snapshot".format(path, VERSION))
+        if little != (sys.byteorder == "little"):
+            raise ValueError("{} was written on a machine of the other byte order".format(path))
+        self.whole = memoryview(self.map)
+        self.views = [] # Every view handed out, so that all of them can be released before the map is closed
+        self.sections = {} # Maps each section name to its type and the position and length of its payload
+        position = HEADER.size
+        for i in range(count):
+            name, type, padding, length = SECTION.unpack_from(self.map, position)
+            position += SECTION.size
+            self.sections[name.rstrip(b"\0").decode()] = (type.decode(), position, length)
+            position += length + (-length % 8)
+
+    # The payload of a section as a memoryview of the map, without copying it. The view is released by close.
+    def view(self, name):
+        type, position, length = self.sections[name]
+        view = self.whole[position:position + length]
+        self.views.append(view)
+        view = view.cast(type)
+        self.views.append(view)
+        return view
+
+    def scalars(self, name):
+        type, position, length = self.sections[name]
+        return json.loads(self.map[position:position + length])
+
+    def array(self, name):
+        return self.view(name).tolist()
+
+    # An integer array in which -1 is read back as None.
+    def nodes(self, name):
+        return [None if value == -1 else value for value in self.view(name)]
+
+    def ragged(self, name):
+        flat = self.view(name)
+        offsets = self.view(name + ".offsets")
+        return [flat[offsets[i]:offsets[i+1]].tolist() for i in range(len(offsets) - 1)]
+
+    def nested(self, name):
+        lists = self.ragged(name)
+        groups = self.view(name + ".groups")
+        return [lists[groups[i]:groups[i+1]] for i in range(len(groups) - 1)]
+
+    def close(self):
+        for view in reversed(self.views):
+            view.release()
+        self.whole.release()
+        self.map.close()
+        self.file.close()
+
+
+# Writes obj to a snapshot file. The class of obj and the number of updates it has seen, which a restart can skip
+# in the update log, are recorded alongside its state.
+def write_snapshot(obj, path, position=0):
+    writer = SnapshotWriter(path)
+    writer.scalars("snapshot", {"class": type(obj).__module__ + "." + type(obj).__name__, "position": position})
+    obj.save(writer)
+    writer.close()
+
+
+# Reads back an object of class cls written by write_snapshot.
+def read_snapshot(cls, path):
+    snapshot = Snapshot(path)
+    try:
+        kind = snapshot.scalars("snapshot")["class"]
+        if kind != cls.__module__ + "." + cls.__name__:
+            raise ValueError("{} holds a {}, not a {}".format(path, kind, cls.__name__))
+        return cls.load(snapshot)
+    finally:
+        snapshot.close()
+
+
+# Gives a class with save and load the methods snapshot, which writes an object to a file of its own, and restore, which reads it back.
+class Snapshotted:
+    def snapshot(self, path, position=0):
+        write_snapshot(self, path, position)
+
+    @classmethod
+    def restore(cls, path):
+        return read_snapshot(cls, path)
+
+
+# The number of updates seen by the object in a snapshot file, when it was written.
+def snapshot_position(path):
+    snapshot = Snapshot(path)
+    try:
+        return snapshot.scalars("snapshot")["position"]
+    finally:
+        snapshot.close()
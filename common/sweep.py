@@ -0,0 +1,212 @@
+import sys, os, json, time, queue, multiprocessing
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from algorithms import ALGORITHMS, create_algorithm, is_integral, result_size
+from update_stream import open_updates
+from update_log import OPCODES, OPERATIONS
+from hopcroft_karp import HopcroftKarp
+from batching import chunked
+
+# Replays one update file through every combination of algorithm and epsilon, in parallel, and compares the results with the exact optimum.
+#
+# Usage: python sweep.py <update file> [--algorithms=fractional1,integral2] [--epsilon=0.05,0.1,0.3] [--batch=0] [--workers=<cores>] [--output=sweep.json]
+#
+# The file is parsed once, into a shared memory block of 32 bit (opcode, u, v) triples, which every worker reads in place through a memoryview
+# instead of parsing the file again. One worker process is started per available core, up to the number of combinations, and pinned to its core.
+# The workers take combinations from a queue until none are left, so the wall time grows with the number of combinations divided by the number of cores.
+# With a positive --batch, the updates are applied through apply_batch in chunks of that size.
+#
+# For bipartite graphs, the maximum matching of the final graph is computed once with Hopcroft-Karp, and each result is compared with it:
+# the ratio is the maximum matching over the matching size for the integral algorithms, and the cover size over the maximum matching,
+# which is the size of the minimum vertex cover by Konig's theorem, for the others. Either way it is at least 1.
+# For other graphs the maximum matching is not computed, and a greedy maximal matching M of the final graph stands in for it. A minimum vertex cover
+# has at least |M| nodes and a maximum matching at most 2|M| edges, so the cover size over |M|, and 2|M| over the matching size, are upper bounds
+# on the ratio, and are reported as such.
+#
+# A worker that dies outside its error handling, for instance when it is killed by a signal or fails to attach to the shared block, sends nothing
+# for the combination it held. The results are therefore awaited with a timeout, and once every worker has exited, the combinations without a
+# result are reported as errors together with the exit codes of the workers.
+
+DEFAULTS = {"algorithms": ",".join(ALGORITHMS), "epsilon": "0.05,0.1,0.3", "batch": "0"}
+
+
+# Parses the update file into an array of triples, and returns it with the header and the final edge set.
+def parse_trace(path):
+    epsilon, n, bip_cut, updates = open_updates(path)
+    trace = array("I")
+    edges = set()
+    for operation, u, v in updates:
+        trace.extend((OPCODES[operation], u, v))
+        edge = (u, v) if u < v else (v, u)
+        if operation == "ins":
+            edges.add(edge)
+        else:
+            edges.discard(edge)
+    return trace, n, bip_cut, edges
+
+
+# The size of a maximum matching of a bipartite graph, given by its edges and the bipartition.
+def maximum_matching_size(edges, n, bip_cut):
+    graph = {u: [] for u in range(bip_cut)}
+    for u, v in edges:
+        if u < bip_cut:
+            graph[u].append(v)
+        else:
+            graph[v].append(u)
+    n = max([n] + [v + 1 for u, v in edges])
+    return len(HopcroftKarp(n).maximum_matching(graph))
+
+
+# The size of a greedy maximal matching. It is at least half the size of a maximum matching, and at most that of a minimum vertex cover.
+def maximal_matching_size(edges):
+    matched = set()
+    for u, v in sorted(edges):
+        if u not in matched and v not in matched:
+            matched.add(u)
+            matched.add(v)
+    return len(matched) // 2
+
+
+# Replays the trace through one algorithm. trace is the memoryview of the shared block, so the updates are decoded straight from it.
+def run(name, epsilon, trace, n, bip_cut, batch=0):
+    Graph = create_algorithm(name, epsilon, n, bip_cut)
+    updates = ((OPERATIONS[trace[i]], trace[i+1], trace[i+2]) for i in range(0, len(trace), 3))
+    start = time.perf_counter()
+    if batch > 0:
+        for chunk in chunked(updates, batch):
+            Graph.apply_batch(chunk)
+    else:
+        insert = Graph.insert
+        delete = Graph.delete
+        for operation, u, v in updates:
+            if operation == "ins":
+                insert(u, v)
+            else:
+                delete(u, v)
+    elapsed = time.perf_counter() - start
+    count = len(trace) // 3
+    return {"elapsed_s": elapsed, "throughput": count / elapsed if elapsed > 0 else 0, "result_size": result_size(Graph, is_integral(name))}
+
+
+# The body of a worker process. It pins itself to core, attaches to the shared trace and runs combinations until it takes None.
+def work(core, block, n, bip_cut, batch, tasks, results):
+    if core != None:
+        os.sched_setaffinity(0, {core})
+    shared = SharedMemory(block)
+    trace = shared.buf.cast("I")
+    try:
+        for name, epsilon in iter(tasks.get, None):
+            result = {"algorithm": name, "epsilon": epsilon, "core": core}
+            try:
+                result.update(run(name, epsilon, trace, n, bip_cut, batch))
+            except Exception as error:
+                result["error"] = "{}: {}".format(type(error).__name__, error)
+            results.put(result)
+    finally:
+        trace.release()
+        shared.close()
+
+
+# Takes the results of the workers until there is one per combination, or until every worker has exited and nothing is left to take.
+def collect(results, processes, count):
+    report = []
+    while len(report) < count:
+        try:
+            report.append(results.get(timeout=1))
+        except queue.Empty:
+            if not any(process.is_alive() for process in processes):
+                break
+    return report
+
+
+# The combinations that got no result, as error results.
+def missing(combinations, report, processes):
+    left = list(combinations)
+    for result in report:
+        left.remove((result["algorithm"], result["epsilon"]))
+    codes = ", ".join(str(process.exitcode) for process in processes if process.exitcode != 0)
+    return [{"algorithm": name, "epsilon": epsilon, "core": None, "error": "no result, workers exited with codes {}".format(codes)} for name, epsilon in left]
+
+
+def sweep(path, options):
+    trace, n, bip_cut, edges = parse_trace(path)
+    optimum = maximum_matching_size(edges, n, bip_cut) if bip_cut else None
+    maximal = maximal_matching_size(edges) if optimum == None else None
+    combinations = [(name, float(epsilon)) for name in options["algorithms"].split(",") for epsilon in options["epsilon"].split(",")]
+    cores = sorted(os.sched_getaffinity(0))
+    workers = min(len(combinations), int(options.get("workers", len(cores))))
+
+    shared = SharedMemory(create=True, size=max(1, len(trace) * trace.itemsize))
+    try:
+        shared.buf[:len(trace) * trace.itemsize] = memoryview(trace).cast("B")
+        tasks = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        for combination in combinations:
+            tasks.put(combination)
+        for i in range(workers):
+            tasks.put(None)
+        start = time.perf_counter()
+        processes = [multiprocessing.Process(target=work, args=(cores[i % len(cores)], shared.name, n, bip_cut, int(options["batch"]), tasks, results))
+                     for i in range(workers)]
+        for process in processes:
+            process.start()
+        report = collect(results, processes, len(combinations))
+        for process in processes:
+            process.join()
+        report.extend(missing(combinations, report, processes))
+        wall = time.perf_counter() - start
+    finally:
+        shared.close()
+        shared.unlink()
+
+    for result in report:
+        result["updates"] = len(trace) // 3
+        if "error" not in result and optimum != None:
+            size = result["result_size"]
+            if is_integral(result["algorithm"]):
+                result["ratio"] = optimum / size if size else (1.0 if optimum == 0 else None)
+            else:
+                result["ratio"] = size / optimum if optimum else 1.0
+        elif "error" not in result:
+            size = result["result_size"]
+            if is_integral(result["algorithm"]):
+                result["ratio_bound"] = 2 * maximal / size if size else (1.0 if maximal == 0 else None)
+            else:
+                result["ratio_bound"] = size / maximal if maximal else 1.0
+    report.sort(key=lambda result: (result["algorithm"], result["epsilon"]))
+    return {"file": path, "n": n, "bip_cut": bip_cut, "edges": len(edges), "maximum_matching": optimum, "maximal_matching": maximal, "workers": workers, "wall_s": wall, "results": report}
+
+
+HEADER = "{:<12} {:>7} {:>9} {:>12} {:>10} {:>8} {:>8} {:>5}".format("algorithm", "eps", "updates", "updates/s", "replay s", "size", "ratio", "core")
+
+
+def print_row(result):
+    if "error" in result:
+        print("{:<12} {:>7} {:>9}  {}".format(result["algorithm"], result["epsilon"], result["updates"], result["error"]))
+        return
+    if result.get("ratio") != None:
+        ratio = "{:.3f}".format(result["ratio"])
+    elif result.get("ratio_bound") != None:
+        ratio = "<={:.3f}".format(result["ratio_bound"])
+    else:
+        ratio = "-"
+    print("{:<12} {:>7} {:>9} {:>12.0f} {:>10.3f} {:>8} {:>8} {:>5}".format(result["algorithm"], result["epsilon"], result["updates"],
+          result["throughput"], result["elapsed_s"], result["result_size"], ratio, result["core"]))
+
+
+if __name__ == "__main__":
+    options = dict(DEFAULTS)
+    options.update(dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--")))
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    summary = sweep(args[0], options)
+    print(HEADER)
+    for result in summary["results"]:
+        print_row(result)
+    if summary["maximum_matching"] != None:
+        optimum = "maximum matching {}".format(summary["maximum_matching"])
+    else:
+        optimum = "the graph is not bipartite, ratios are bounded with a maximal matching of {}".format(summary["maximal_matching"])
+    print("{} combinations on {} workers in {:.3f}s; {}".format(len(summary["results"]), summary["workers"], summary["wall_s"], optimum))
+    if "output" in options:
+        with open(options["output"], "w") as file:
+            json.dump({"options": options, **summary}, file, indent=1)
@@ -0,0 +1,102 @@
+import sys, mmap, struct
+
+# A compact binary format for update files, read back through a memory map.
+#
+# The file starts with a 32 byte header: the magic bytes, a format version, epsilon, n and bip_cut (0 when the graph is not bipartite).
+# It is followed by fixed width 9 byte records (op, u, v), where op is 0 for an insertion and 1 for a deletion,
+# and u and v are unsigned 32 bit node ids. All values are little-endian.
+#
+# Usage: python update_log.py <text file> <binary file>
+# converts an update file written by graph_generator.py into the binary format.
+
+MAGIC = b"DGUL"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxdQQ")
+RECORD = struct.Struct("<BII")
+OPERATIONS = ["ins", "del"]
+OPCODES = {"ins": 0, "del": 1}
+NUMPY_RECORD = [("op", "u1"), ("u", "<u4"), ("v", "<u4")]
+
+
+# Writes updates in the binary format. Records are packed as they arrive, so an update stream can be written without buffering it.
+class BinaryUpdateWriter:
+    def __init__(self, path, epsilon, n, bip_cut=0):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, float(epsilon), n, bip_cut))
+
+    def write(self, operation, u, v):
+        self.file.write(RECORD.pack(OPCODES[operation], u, v))
+
+    def close(self):
+        self.file.close()
+
+
+# Writes updates in the original text format.
+class TextUpdateWriter:
+    def __init__(self, path, epsilon, n, bip_cut=None):
+        self.file = open(path, "w")
+        self.file.write(str(epsilon) + " " + str(n) + ("" if bip_cut is None else " " + str(bip_cut)) + "\n")
+
+    def write(self, operation, u, v):
+        self.file.write(operation + " " + str(u) + " " + str(v) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+# Returns true if the file at path starts with the binary header.
+def is_binary_log(path):
+    with open(path, "rb") as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+# A read-only view of a binary update file. Records are decoded straight from the memory map without copying the file.
+class BinaryUpdateLog:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.epsilon, self.n, self.bip_cut = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not a version {} binary update file".format(path, VERSION))
+        self.count = (len(self.map) - HEADER.size) // RECORD.size
+        self.view = memoryview(self.map)[HEADER.size:HEADER.size + self.count * RECORD.size]
+
+    def __len__(self):
+        return self.count
+
+    # Yields the raw (opcode, u, v) records in order.
+    def records(self, start=0, stop=None):
+        stop = self.count if stop is None else stop
+        return struct.iter_unpack(RECORD.format, self.view[start * RECORD.size:stop * RECORD.size])
+
+    # Yields (operation, u, v) in the same form as update_stream.read_updates.
+    def __iter__(self):
+        for op, u, v in self.records():
+            yield OPERATIONS[op], u, v
+
+    # Yields NumPy structured arrays of at most size records each. The arrays share memory with the map. Requires NumPy.
+    def chunks(self, size):
+        import numpy
+        records = numpy.frombuffer(self.view, dtype=numpy.dtype(NUMPY_RECORD))
+        for start in range(0, self.count, size):
+            yield records[start:start + size]
+
+    def close(self):
+        self.view.release()
+        self.map.close()
+        self.file.close()
+
+
+# Converts a text update file into the binary format.
+def convert_text_to_binary(text_path, binary_path):
+    from update_stream import read_header, read_updates
+    with open(text_path, "r") as file:
+        epsilon, n, bip_cut = read_header(file)
+        writer = BinaryUpdateWriter(binary_path, epsilon, n, bip_cut)
+        for operation, u, v in read_updates(file):
+            writer.write(operation, u, v)
+        writer.close()
+
+
+if __name__ == "__main__":
+    convert_text_to_binary(sys.argv[1], sys.argv[2])
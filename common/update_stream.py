@@ -0,0 +1,38 @@
+import sys
+from update_log import BinaryUpdateLog, is_binary_log
+
+# Readers for update files in the text format written by graph_generator.py.
+# The first line holds epsilon, n and, for bipartite graphs, bip_cut. Every further line is "ins u v" or "del u v".
+# Files in the binary format of update_log.py are recognised by their header and read through a memory map instead.
+
+
+# Opens an update file for reading. The name "-" stands for standard input.
+def open_update_file(path):
+    return sys.stdin if path == "-" else open(path, "r")
+
+
+# Reads the first line of the file, returning epsilon, n and bip_cut (0 when the graph is not bipartite).
+def read_header(file):
+    header = file.readline().split()
+    epsilon = float(header[0])
+    n = int(header[1])
+    bip_cut = int(header[2]) if len(header) > 2 else 0
+    return epsilon, n, bip_cut
+
+
+# Yields the remaining updates one at a time as (operation, u, v), so the file is never held in memory.
+def read_updates(file):
+    for line in file:
+        update = line.split()
+        if len(update) == 3:
+            yield update[0], int(update[1]), int(update[2])
+
+
+# Opens an update file in either format, returning epsilon, n, bip_cut and an iterator over the updates.
+def open_updates(path):
+    if path != "-" and is_binary_log(path):
+        log = BinaryUpdateLog(path)
+        return log.epsilon, log.n, log.bip_cut, iter(log)
+    file = open_update_file(path)
+    epsilon, n, bip_cut = read_header(file)
+    return epsilon, n, bip_cut, read_updates(file)
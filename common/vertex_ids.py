@@ -0,0 +1,30 @@
+# Maps external vertex ids, which may be any hashable values such as sparse integers or strings, to the dense ids 0, 1, 2, ...
+# that the algorithms index their arrays by, in order of first appearance. Since the algorithms grow their vertex sets on demand,
+# their arrays are then sized by the number of vertices seen so far rather than by the largest external id.
+# The dense ids do not keep the bipartition of a bipartite graph, so the integral drivers must be given their ids directly.
+
+
+class VertexIds:
+    def __init__(self):
+        self.dense = {} # Maps each external id to its dense id
+        self.external = [] # Entry [i] is the external id of dense id i
+
+    def __len__(self):
+        return len(self.external)
+
+    # The dense id of an external id, which is assigned the next free dense id the first time it is seen.
+    def id(self, vertex):
+        dense = self.dense.get(vertex)
+        if dense is None:
+            dense = len(self.external)
+            self.dense[vertex] = dense
+            self.external.append(vertex)
+        return dense
+
+    def vertex(self, dense):
+        return self.external[dense]
+
+    # Yields the updates of an update stream with their endpoints replaced by dense ids.
+    def relabel(self, updates):
+        for operation, u, v in updates:
+            yield operation, self.id(u), self.id(v)
@@ -0,0 +1,229 @@
+import math, random
+from collections import deque
+
+# Workload models for the update generator.
+# Every model produces a stream of updates ("ins" or "del", u, v) from its own seeded random number generator,
+# so the same model, n, bip_cut and seed always give the same stream.
+# When bip_cut is positive, every edge joins a node below bip_cut to a node at or above it.
+
+
+class Workload:
+    def __init__(self, n, bip_cut=0, seed=None):
+        self.n = n
+        self.bip_cut = bip_cut
+        self.random = random.Random(seed)
+        self.max_edges = (n * (n - 1)) / 2
+        self.possible_edges = bip_cut * (n - bip_cut) if bip_cut else self.max_edges
+        self.added_edges = [] # The live edges, with positions in self.positions for constant time removal
+        self.positions = {}
+
+    # Yields the given number of updates. Subclasses implement next_update.
+    def updates(self, number_of_updates):
+        for update in range(number_of_updates):
+            yield self.next_update()
+
+    # Draws a uniformly random pair of distinct nodes, with the smaller node first.
+    def random_pair(self):
+        if self.bip_cut:
+            return (self.random.randrange(self.bip_cut), self.random.randrange(self.bip_cut, self.n))
+        u = self.random.randrange(self.n)
+        v = self.random.randrange(self.n - 1)
+        if v >= u:
+            v += 1
+        return (u, v) if u < v else (v, u)
+
+    # Draws a node that can be joined to u, i.e. one on the other side of the bipartition.
+    def random_partner(self, u):
+        if self.bip_cut:
+            return self.random.randrange(self.bip_cut, self.n) if u < self.bip_cut else self.random.randrange(self.bip_cut)
+        v = self.random.randrange(self.n - 1)
+        return v + 1 if v >= u else v
+
+    # Draws uniformly random pairs until one is not an edge. This takes 1/(1-d) draws in expectation at edge density d.
+    def random_absent_edge(self):
+        edge = self.random_pair()
+        while edge in self.positions:
+            edge = self.random_pair()
+        return edge
+
+    def random_edge(self):
+        return self.added_edges[self.random.randrange(len(self.added_edges))]
+
+    def is_full(self):
+        return len(self.added_edges) == self.possible_edges
+
+    def add_edge(self, edge):
+        self.positions[edge] = len(self.added_edges)
+        self.added_edges.append(edge)
+        return ("ins", edge[0], edge[1])
+
+    def remove_edge(self, edge):
+        pos = self.positions.pop(edge)
+        last = self.added_edges.pop()
+        if last != edge:
+            self.added_edges[pos] = last
+            self.positions[last] = pos
+        return ("del", edge[0], edge[1])
+
+
+def ordered(u, v):
+    return (u, v) if u < v else (v, u)
+
+
+# The original model: while the graph has a fraction d of the n(n-1)/2 possible edges, the next update deletes a uniformly random edge
+# with probability sin(pi/2 * d), and otherwise inserts a uniformly random absent edge.
+class Uniform(Workload):
+    def next_update(self):
+        del_prob = math.sin(math.pi * 0.5 * len(self.added_edges) / self.max_edges)
+        if self.is_full() or (len(self.added_edges) != 0 and self.random.random() <= del_prob):
+            return self.remove_edge(self.random_edge())
+        return self.add_edge(self.random_absent_edge())
+
+
+# Preferential attachment. Insertions pick their first endpoint with probability proportional to degree + 1, which gives
+# a heavy-tailed degree distribution. A node is drawn in proportion to its degree by taking an endpoint of a uniformly random edge.
+# Deletions follow the same sin-shaped probability as the uniform model.
+class PowerLaw(Workload):
+    def preferential_node(self):
+        if self.random.random() * (self.n + 2 * len(self.added_edges)) < self.n:
+            return self.random.randrange(self.n)
+        return self.random_edge()[self.random.randrange(2)]
+
+    def next_update(self):
+        del_prob = math.sin(math.pi * 0.5 * len(self.added_edges) / self.max_edges)
+        if self.is_full() or (len(self.added_edges) != 0 and self.random.random() <= del_prob):
+            return self.remove_edge(self.random_edge())
+        for attempt in range(self.n):
+            u = self.preferential_node()
+            edge = ordered(u, self.random_partner(u))
+            if edge not in self.positions:
+                return self.add_edge(edge)
+        return self.add_edge(self.random_absent_edge())
+
+
+# Sliding-window expiry. Every update inserts a random absent edge until window edges are live; from then on,
+# insertions alternate with deletions of the oldest live edge.
+class SlidingWindow(Workload):
+    def __init__(self, n, bip_cut=0, seed=None, window=None):
+        Workload.__init__(self, n, bip_cut, seed)
+        self.window = min(window if window is not None else n, self.possible_edges)
+        self.queue = deque()
+        self.expire_next = False
+
+    def next_update(self):
+        if len(self.queue) >= self.window and self.expire_next:
+            self.expire_next = False
+            return self.remove_edge(self.queue.popleft())
+        self.expire_next = True
+        edge = self.random_absent_edge()
+        self.queue.append(edge)
+        return self.add_edge(edge)
+
+
+# Hub churn. A few hub nodes are repeatedly joined to, and cut from, random partners, so their degrees stay high while their edges,
+# and hence their matched edges, keep changing. A fraction of the updates is uniform background traffic.
+# This drives the surrogate and aug_path branches of integral_matching_1/vertex_cover.py, which only run for high-degree nodes.
+class HubChurn(Workload):
+    def __init__(self, n, bip_cut=0, seed=None, hubs=3, background=0.1):
+        Workload.__init__(self, n, bip_cut, seed)
+        self.hubs = [self.random.randrange(n) for i in range(hubs)]
+        self.target_degree = max(1, int(n ** 0.5))
+        self.background = background
+        self.hub_edges = {hub: [] for hub in self.hubs} # The live edges at each hub, with positions in self.hub_positions
+        self.hub_positions = {}
+
+    def add_edge(self, edge):
+        for node in edge:
+            if node in self.hub_edges:
+                self.hub_positions[(node, edge)] = len(self.hub_edges[node])
+                self.hub_edges[node].append(edge)
+        return Workload.add_edge(self, edge)
+
+    def remove_edge(self, edge):
+        for node in edge:
+            if node in self.hub_edges:
+                edges = self.hub_edges[node]
+                pos = self.hub_positions.pop((node, edge))
+                last = edges.pop()
+                if last != edge:
+                    edges[pos] = last
+                    self.hub_positions[(node, last)] = pos
+        return Workload.remove_edge(self, edge)
+
+    def next_update(self):
+        if self.random.random() < self.background:
+            if len(self.added_edges) != 0 and (self.is_full() or self.random.random() < 0.5):
+                return self.remove_edge(self.random_edge())
+            return self.add_edge(self.random_absent_edge())
+        hub = self.hubs[self.random.randrange(len(self.hubs))]
+        edges = self.hub_edges[hub]
+        if len(edges) != 0 and (len(edges) >= self.target_degree or self.random.random() < 0.5):
+            return self.remove_edge(edges[self.random.randrange(len(edges))])
+        for attempt in range(self.n):
+            edge = ordered(hub, self.random_partner(hub))
+            if edge not in self.positions:
+                return self.add_edge(edge)
+        return self.remove_edge(edges[self.random.randrange(len(edges))])
+
+
+# Adversarial matched-edge deletion. The model keeps a greedy maximal matching of the graph it generates, which is what the
+# integral drivers maintain, and every deletion removes one of its matched edges, forcing the endpoints to look for new mates.
+# Insertions are uniform, and the deletion probability follows the uniform model.
+class MatchedEdgeDeletion(Workload):
+    def __init__(self, n, bip_cut=0, seed=None):
+        Workload.__init__(self, n, bip_cut, seed)
+        self.mate = [None for i in range(n)]
+        self.neighbours = [set() for i in range(n)]
+        self.matching = [] # The matched edges, with positions in self.matching_positions
+        self.matching_positions = {}
+
+    def match(self, u, v):
+        self.mate[u] = v
+        self.mate[v] = u
+        edge = ordered(u, v)
+        self.matching_positions[edge] = len(self.matching)
+        self.matching.append(edge)
+
+    def unmatch(self, edge):
+        pos = self.matching_positions.pop(edge)
+        last = self.matching.pop()
+        if last != edge:
+            self.matching[pos] = last
+            self.matching_positions[last] = pos
+        self.mate[edge[0]] = None
+        self.mate[edge[1]] = None
+
+    def rematch(self, u):
+        for w in self.neighbours[u]:
+            if self.mate[w] is None:
+                self.match(u, w)
+                return
+
+    def next_update(self):
+        del_prob = math.sin(math.pi * 0.5 * len(self.added_edges) / self.max_edges)
+        if self.is_full() or (len(self.added_edges) != 0 and self.random.random() <= del_prob):
+            edge = self.matching[self.random.randrange(len(self.matching))]
+            self.neighbours[edge[0]].discard(edge[1])
+            self.neighbours[edge[1]].discard(edge[0])
+            self.unmatch(edge)
+            self.rematch(edge[0])
+            self.rematch(edge[1])
+            return self.remove_edge(edge)
+        edge = self.random_absent_edge()
+        u, v = edge
+        self.neighbours[u].add(v)
+        self.neighbours[v].add(u)
+        if self.mate[u] is None and self.mate[v] is None:
+            self.match(u, v)
+        return self.add_edge(edge)
+
+
+#A dictionary to map the workload name to its model
+WORKLOADS = {"uniform": Uniform, "powerlaw": PowerLaw, "window": SlidingWindow, "hubchurn": HubChurn, "adversarial": MatchedEdgeDeletion}
+
+
+# Writes number_of_updates updates of the workload to sink, one at a time, so no part of the stream is buffered.
+# The sink is any object with a write(operation, u, v) method, such as the writers in update_log.py.
+def stream(workload, number_of_updates, sink):
+    for operation, u, v in workload.updates(number_of_updates):
+        sink.write(operation, u, v)
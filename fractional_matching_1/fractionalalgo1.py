@@ -1,4 +1,5 @@
-import math
+from batching import coalesce
+from dynamic_graph import DynamicGraph
 
 # A full implementation of the algorithm to compute deterministic fully dynamic vertex covers.
 #
@@ -8,23 +9,37 @@ import math
 # DOI: 10.1137/140998925
 
 
-class Algorithm:
+class Algorithm(DynamicGraph):
 
 
     #Defines the relevant constants and data structures.
     def __init__(self, epsilon, n):
         self.n = n
+        self.epsilon = epsilon
         self.dirty_nodes = []
         self.dirty_pointers = [None for i in range(n)]
         self.alpha = 1 + 3*epsilon
         self.beta = 1 + epsilon
-        self.L = 1 + math.ceil(math.log(self.n / self.alpha, self.beta))
         self.level = [0 for i in range(n)]
         self.weight = [0 for i in range(n)]
-        self.neighbours = [[[] for j in range(self.L)] for i in range(n)]
-        self.nbhd_pointers = [[None for j in range(n)] for i in range(n)] # Entry [u][v] corresponds to u's position in the neighbourhood lists of v
+        self.total_weight = 0 # The weight of the fractional matching, i.e. the sum of all edge weights
+        self.neighbours = [[[]] for i in range(n)] # Entry [v][i] is the list N(v, i) for i above l(v), and N(v, <= l(v)) for i = l(v), see bucket
+        self.nbhd_pointers = [{} for i in range(n)] # Entry [u][v] corresponds to u's position in the neighbourhood lists of v, and only exists while (u, v) is an edge
         self.heavy_nodes = [] #The list of all nodes with weight at least 1
         self.heavy_pointers = [None for i in range(n)]
+        self.on_level_change = None # Called as on_level_change(v, old_level) whenever v has moved up or down a level
+        self.stats = None # The work counters, see instrumentation.py
+
+
+    def grow(self, n):
+        added = n - self.n
+        self.dirty_pointers.extend([None] * added)
+        self.level.extend([0] * added)
+        self.weight.extend([0] * added)
+        self.neighbours.extend([[]] for i in range(added))
+        self.nbhd_pointers.extend({} for i in range(added))
+        self.heavy_pointers.extend([None] * added)
+        self.n = n
 
 
     # Invariant 2.4; a violation means that we have a dirty node whose level must be changed.
@@ -44,10 +59,10 @@ class Algorithm:
 
 
     # Gets the position of the sublist containing u in the neighbourhood lists of v.
-    # Importantly, the neighbourhood lists are ordered backwards, such that Nv(0, i) is the final element of the list
-    # Since this is the only element that needs adjusting in each step of the handler, we can delete or add new elements in constant time.
-    def level_difference(self, u, v):
-        return len(self.neighbours[v]) - 1 -max(0, self.level[u] - self.level[v])
+    # The lists are indexed by level, so u is in N(v, l(u)) if it is above v, and in N(v, <= l(v)), at position l(v), otherwise.
+    # The lists below l(v) are left in place, empty, so that moving v up or down a level only merges or splits two neighbouring lists.
+    def bucket_position(self, u, v):
+        return max(self.level[u], self.level[v])
 
 
     # Whenever some nodes have their weight updated, we check whether they still belong in the set of heavy nodes. O(1) update time per node.
@@ -75,14 +90,50 @@ class Algorithm:
                 self.set_dirty(node)
 
 
+    def insert(self, u, v):
+        if self.stats != None:
+            self.stats.begin("ins")
+        self.insert_edge(u, v)
+        self.handle_dirty()
+        if self.stats != None:
+            self.stats.end()
+
+
+    def delete(self, u, v):
+        if self.stats != None:
+            self.stats.begin("del")
+        self.delete_edge(u, v)
+        self.handle_dirty()
+        if self.stats != None:
+            self.stats.end()
+
+
+    # Applies a batch of ("ins" or "del", u, v) updates. Updates that cancel out within the batch are skipped,
+    # and the dirty nodes left by the others are fixed in a single pass at the end.
+    # Since handle_dirty works through any set of dirty nodes, Invariant 2.4 holds afterwards exactly as after sequential updates.
+    def apply_batch(self, updates):
+        if self.stats != None:
+            self.stats.begin("batch")
+        for operation, u, v in coalesce(updates):
+            if operation == "ins":
+                self.insert_edge(u, v)
+            else:
+                self.delete_edge(u, v)
+        self.handle_dirty()
+        if self.stats != None:
+            self.stats.end()
+
+
     # When we insert an edge, we must:
         # Adjust the weight of its endpoints.
         # Insert each endpoint into the neighbourhood lists of the other endpoint.
         # Consider if the edges violate Invariant 2.4, and thus become dirty.
-    def insert(self, u, v):
+    def insert_edge(self, u, v):
+        self.ensure_vertex(max(u, v))
         weight = self.edge_weight(u, v)
         self.weight[u] += weight
         self.weight[v] += weight
+        self.total_weight += weight
 
         self.consider_heavy([u, v])
 
@@ -90,17 +141,17 @@ class Algorithm:
         self.add_neighbours(v,u)
 
         self.consider_dirty([u,v])
-        self.handle_dirty()
 
 
     # When we delete an edge, we must:
         # Adjust the weight of its endpoints.
         # Remove each endpoint into the neighbourhood lists of the other endpoint.
         # Consider if the edges violate Invariant 2.4, and thus become dirty.
-    def delete(self, u, v):
+    def delete_edge(self, u, v):
         weight = self.edge_weight(u, v)
         self.weight[u] -= weight
         self.weight[v] -= weight
+        self.total_weight -= weight
 
         self.consider_heavy([u, v])
 
@@ -108,35 +159,45 @@ class Algorithm:
         self.remove_neighbours(v,u)
 
         self.consider_dirty([u,v])
-        self.handle_dirty()
 
     
+    # Returns u's neighbourhood list at position pos, as given by bucket_position. A node only has lists up to the highest level
+    # it or a neighbour has reached, so when a neighbour rises above that, empty lists are added at the end, which moves no other list.
+    def bucket(self, u, pos):
+        lists = self.neighbours[u]
+        while len(lists) <= pos:
+            lists.append([])
+        return lists[pos]
+
+
     # Places node v into the neighbourhood lists of node u.
     def add_neighbours(self, u, v):
-        pos = self.level_difference(v, u) 
-        self.neighbours[u][pos].append(v)
-        self.nbhd_pointers[v][u] = len(self.neighbours[u][pos])-1
+        bucket = self.bucket(u, self.bucket_position(v, u))
+        bucket.append(v)
+        self.nbhd_pointers[v][u] = len(bucket) - 1
 
 
     # Removes node v from the neighbourhood lists of node u, in constant time.
+    # The pointer entry is dropped as well, so the pointer maps only ever hold one entry per endpoint of an edge.
     def remove_neighbours(self, u, v):
         v_pos_in_u = self.nbhd_pointers[v][u]
-        level = self.level_difference(v, u)
+        level = self.bucket_position(v, u)
         if v_pos_in_u != len(self.neighbours[u][level]) - 1:
             self.swap_to_end(v, u)
         self.neighbours[u][level].pop()
+        del self.nbhd_pointers[v][u]
 
     
     # When a node v changes level, we must update its position in the neighbourhood lists of its neighbours.
-    # Note that, because the neighbourhood lists are ordered backwards, we subtract the level_change instead of adding it.
     def update_position(self, v, u, level_change):
         v_pos_in_u = self.nbhd_pointers[v][u]
-        leveldiff = self.level_difference(v, u)
+        leveldiff = self.bucket_position(v, u)
         if v_pos_in_u != len(self.neighbours[u][leveldiff]) - 1:
             self.swap_to_end(v, u)
         self.neighbours[u][leveldiff].pop()
-        self.neighbours[u][leveldiff-level_change].append(v)
-        self.nbhd_pointers[v][u] = len(self.neighbours[u][leveldiff-level_change]) - 1
+        bucket = self.bucket(u, leveldiff + level_change)
+        bucket.append(v)
+        self.nbhd_pointers[v][u] = len(bucket) - 1
 
 
     # When v's level increases, updates v's position in the neighbourhood lists of u.
@@ -153,7 +214,7 @@ class Algorithm:
     # The pointers must be updated when this happens.
     def swap_to_end(self, v, u): 
         v_pos_in_u = self.nbhd_pointers[v][u]
-        leveldiff = self.level_difference(v, u)
+        leveldiff = self.bucket_position(v, u)
         temp = self.neighbours[u][leveldiff][v_pos_in_u]
         self.neighbours[u][leveldiff][v_pos_in_u] = self.neighbours[u][leveldiff][-1]
         self.neighbours[u][leveldiff][-1] = temp
@@ -178,13 +239,51 @@ class Algorithm:
         self.dirty_pointers[v] = None
 
 
+    # When v moves up from level l, its lists N(v, <= l) and N(v, l+1) become the single list N(v, <= l+1), at position l+1.
+    # The smaller list is appended onto the larger one, so only the nodes that actually move have their pointers rewritten,
+    # and the emptied list is left at position l for the next time v moves down.
+    def merge_top_buckets(self, v):
+        lists = self.neighbours[v]
+        l = self.level[v] - 1
+        lower = lists[l]
+        upper = self.bucket(v, l + 1)
+        if len(lower) > len(upper):
+            lower, upper = upper, lower
+            lists[l] = lower
+            lists[l + 1] = upper
+        offset = len(upper)
+        upper.extend(lower)
+        for i in range(len(lower)):
+            self.nbhd_pointers[lower[i]][v] = offset + i
+        lower.clear()
+
+
+    # When v moves down from level l, its list N(v, <= l) splits into N(v, l) and N(v, <= l-1).
+    # The neighbours below level l, already gathered in the empty list at position l-1, are swapped out of the list at position l,
+    # which then holds N(v, l) in place.
+    def split_top_bucket(self, v, lower_neighbours):
+        equal_neighbours = self.neighbours[v][self.level[v] + 1]
+        for u in lower_neighbours:
+            pos = self.nbhd_pointers[u][v]
+            last = equal_neighbours[-1]
+            equal_neighbours[pos] = last
+            self.nbhd_pointers[last][v] = pos
+            equal_neighbours.pop()
+        for i in range(len(lower_neighbours)):
+            self.nbhd_pointers[lower_neighbours[i]][v] = i
+
+
     # An implementation of the while loop described in Figure 1, section 2.3
     def handle_dirty(self):
+        stats = self.stats
         while len(self.dirty_nodes) != 0:
             
             v = self.dirty_nodes[-1]
+            if stats != None:
+                stats.peak("dirty_nodes", len(self.dirty_nodes))
+                stats.count("neighbours_touched", len(self.neighbours[v][self.level[v]]))
             if self.weight[v] > self.alpha * self.beta:
-                for u in self.neighbours[v][-1]:
+                for u in self.neighbours[v][self.level[v]]:
                     if self.level[u] <= self.level[v]:
                         self.update_position_levelup(v, u)
 
@@ -194,28 +293,22 @@ class Algorithm:
                     self.weight[u] += diff
                     self.consider_dirty([u])
                     self.weight[v] += diff
+                    self.total_weight += diff
                     self.consider_heavy([u, v])
 
                 self.level[v] += 1
-                temp = self.neighbours[v][-1]
-                self.neighbours[v].pop()
-                l = len(self.neighbours[v][-1])
-                self.neighbours[v][-1] = self.neighbours[v][-1] + temp
-                i = 0
-                for node in temp:
-                    self.nbhd_pointers[node][v] = l + i
-                    i+=1
+                self.merge_top_buckets(v)
+                if stats != None:
+                    stats.count("level_ups")
+                if self.on_level_change != None:
+                    self.on_level_change(v, self.level[v] - 1)
 
             elif self.weight[v] < 1 and self.level[v] > 0:
-                v = self.dirty_nodes[-1]
-                lower_neighbours = []
-                equal_neighbours = []
-                for u in self.neighbours[v][-1]:
+                lower_neighbours = self.neighbours[v][self.level[v] - 1]
+                for u in self.neighbours[v][self.level[v]]:
                     if self.level[u] < self.level[v]:
                         lower_neighbours.append(u)
                         self.update_position_leveldown(v, u)
-                    else:
-                        equal_neighbours.append(u)
 
                     prev_edge_weight = self.edge_weight(u, v)
                     new_edge_weight = self.level_edge_weight(self.level[u], self.level[v]-1)
@@ -224,32 +317,76 @@ class Algorithm:
                     self.consider_dirty([u])
                     
                     self.weight[v] += diff
+                    self.total_weight += diff
                     self.consider_heavy([u, v])
 
                 self.level[v] -= 1
-                self.neighbours[v] = self.neighbours[v][:-1] + [equal_neighbours] + [lower_neighbours]
-                i=0
-                for node in lower_neighbours:
-                    self.nbhd_pointers[node][v] = i
-                    i+=1
-                i=0
-                for node in equal_neighbours:
-                    self.nbhd_pointers[node][v] = i
-                    i+=1
+                self.split_top_bucket(v, lower_neighbours)
+                if stats != None:
+                    stats.count("level_downs")
+                if self.on_level_change != None:
+                    self.on_level_change(v, self.level[v] + 1)
 
             if not self.is_violation(v):
                 self.remove_dirty(v)
     
 
+    # The pointer maps are rebuilt from the lists they point into, so they are not written.
+    # The neighbourhood lists are written under a name of their own since they are indexed by level, so that snapshots of the
+    # earlier layout, which ran from the highest level down, fail to load instead of loading wrong.
+    def save(self, writer, prefix=""):
+        writer.scalars(prefix + "scalars", {"epsilon": self.epsilon, "n": self.n, "total_weight": self.total_weight})
+        writer.array(prefix + "level", self.level)
+        writer.array(prefix + "weight", self.weight, "d")
+        writer.array(prefix + "dirty_nodes", self.dirty_nodes)
+        writer.array(prefix + "heavy_nodes", self.heavy_nodes)
+        writer.nested(prefix + "level_lists", self.neighbours)
+
+    @classmethod
+    def load(cls, snapshot, prefix=""):
+        scalars = snapshot.scalars(prefix + "scalars")
+        graph = cls(scalars["epsilon"], scalars["n"])
+        graph.total_weight = scalars["total_weight"]
+        graph.level = snapshot.array(prefix + "level")
+        graph.weight = snapshot.array(prefix + "weight")
+        graph.neighbours = snapshot.nested(prefix + "level_lists")
+        for u in range(graph.n):
+            for bucket in graph.neighbours[u]:
+                for i in range(len(bucket)):
+                    graph.nbhd_pointers[bucket[i]][u] = i
+        graph.dirty_nodes = snapshot.array(prefix + "dirty_nodes")
+        for i in range(len(graph.dirty_nodes)):
+            graph.dirty_pointers[graph.dirty_nodes[i]] = i
+        graph.heavy_nodes = snapshot.array(prefix + "heavy_nodes")
+        for i in range(len(graph.heavy_nodes)):
+            graph.heavy_pointers[graph.heavy_nodes[i]] = i
+        return graph
+
+
     # Describes the state of the graph.
     def toString(self):
         for v in range(self.n):
             print(v, self.level[v], round(self.weight[v], 3))
         print("vertex cover:", self.heavy_nodes)
         print("{} out of {}".format(len(self.heavy_nodes), self.n))
-        print("fractional matching of weight {}".format(round(sum(self.weight)/2, 3)))
+        print("fractional matching of weight {}".format(round(self.total_weight, 3)))
 
 
     # The algorithm maintains an approximate vertex cover as the set of nodes with weight at least 1.
+    # A copy is returned, so that callers cannot corrupt the list of heavy nodes.
     def vertex_cover(self):
-        return self.heavy_nodes
\ No newline at end of file
+        return list(self.heavy_nodes)
+
+
+    # This algorithm only maintains a fractional matching, so the matching queries are those of DynamicGraph.
+    def fractional_weight(self):
+        return self.total_weight
+
+    def cover_size(self):
+        return len(self.heavy_nodes)
+
+    def in_cover(self, v):
+        return self.heavy_pointers[v] != None
+
+    def cover_nodes(self):
+        return iter(self.heavy_nodes)
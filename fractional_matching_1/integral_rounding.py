@@ -0,0 +1,279 @@
+import fractionalalgo1
+from batching import coalesce
+from dynamic_graph import DynamicGraph
+
+# A maximal matching kept alongside the fractional matching of fractionalalgo1, whose levels decide where each node searches for a mate.
+# It is registered as "maximal" rather than as a rounding, since it does not meet the polylogarithmic bound of the rounding it follows:
+#
+# Sayan Bhattacharya and Peter Kiss
+# Deterministic Rounding of Dynamic Fractional Matchings
+# 48th International Colloquium on Automata, Languages, and Programming (ICALP 2021)
+# DOI: 10.4230/LIPIcs.ICALP.2021.27
+#
+# Bhattacharya and Kiss sparsify the support of the fractional matching by repeated degree splitting, and keep a maximal matching
+# in the sparse subgraph that is left. The degree splitting is not reproduced here. Instead the levels of the fractional matching decide
+# which endpoint looks after each edge: the edge (u, v) is owned by the endpoint at the higher level, or by both when their levels are equal,
+# and every node keeps a list of the edges it owns. A maximal matching of the whole graph is maintained. A node that is freed searches
+# the edges it owns, and the free nodes that own an edge to it, for a new mate. Since every edge has an owner, it finds a free neighbour
+# whenever there is one, so no edge ever has two free endpoints and the matching is a 2-approximate maximum matching.
+# Freeing a node, or moving it a level, costs time linear in the number of edges it owns, which is N(v, <= l(v)) in fractionalalgo1.
+# The edges to neighbours at higher levels are never looked at, but a node at a high level can own most of its edges,
+# so the work per update is not bounded by more than the degree, unlike in Bhattacharya and Kiss.
+
+
+class Algorithm(DynamicGraph):
+
+    # The bipartition is not needed, since the matching works on any graph, but it is accepted like in the other integral algorithms.
+    def __init__(self, epsilon, n, bip_cut=0):
+        self.epsilon = epsilon
+        self.n = n
+        self.bip_cut = bip_cut
+        self.fractional = fractionalalgo1.Algorithm(epsilon, n)
+        self.fractional.on_level_change = self.level_changed
+        self.kept = [[] for i in range(n)] # The neighbours of v whose edges v owns, i.e. those at a level no higher than v's
+        self.kept_pointers = [{} for i in range(n)] # Entry [v][u] is u's position in kept[v], and only exists while v owns the edge
+        self.free_keepers = [[] for i in range(n)] # The free nodes that own an edge to v
+        self.free_keeper_pointers = [{} for i in range(n)] # Entry [v][u] is u's position in free_keepers[v]
+        self.matching = {} # Maps the smaller endpoint of each matched edge to its larger endpoint
+        self.mates = [None for i in range(n)]
+        self.stats = None # The work counters, see instrumentation.py
+
+
+    def insert(self, u, v):
+        if self.stats != None:
+            self.stats.begin("ins")
+        self.insert_edge(u, v)
+        self.fractional.handle_dirty()
+        if self.stats != None:
+            self.stats.end()
+
+
+    def delete(self, u, v):
+        if self.stats != None:
+            self.stats.begin("del")
+        self.delete_edge(u, v)
+        self.fractional.handle_dirty()
+        if self.stats != None:
+            self.stats.end()
+
+
+    # Applies a batch of ("ins" or "del", u, v) updates, leaving the levels to be fixed in a single pass at the end like fractionalalgo1.
+    # The owned edges follow the level changes as they happen, so the matching is maximal afterwards.
+    def apply_batch(self, updates):
+        if self.stats != None:
+            self.stats.begin("batch")
+        for operation, u, v in coalesce(updates):
+            if operation == "ins":
+                self.insert_edge(u, v)
+            else:
+                self.delete_edge(u, v)
+        self.fractional.handle_dirty()
+        if self.stats != None:
+            self.stats.end()
+
+
+    # The fractional matching adds its own counters to the same object.
+    def enable_stats(self, callback=None):
+        self.fractional.stats = super().enable_stats(callback)
+        return self.stats
+
+    def disable_stats(self):
+        self.stats = None
+        self.fractional.stats = None
+
+
+    # The fractional matching grows along with the lists here.
+    def grow(self, n):
+        added = n - self.n
+        self.fractional.grow(n)
+        self.kept.extend([] for i in range(added))
+        self.kept_pointers.extend({} for i in range(added))
+        self.free_keepers.extend([] for i in range(added))
+        self.free_keeper_pointers.extend({} for i in range(added))
+        self.mates.extend([None] * added)
+        self.n = n
+
+
+    # The new edge is kept by each endpoint that owns it.
+    def insert_edge(self, u, v):
+        self.ensure_vertex(max(u, v))
+        self.fractional.insert_edge(u, v)
+        level = self.fractional.level
+        for x, y in [(u, v), (v, u)]:
+            if level[y] <= level[x]:
+                self.keep(x, y)
+
+
+    # If the edge was matched, both endpoints look for new mates.
+    def delete_edge(self, u, v):
+        for x, y in [(u, v), (v, u)]:
+            if y in self.kept_pointers[x]:
+                self.drop(x, y)
+        self.fractional.delete_edge(u, v)
+        if self.mates[u] == v:
+            self.unmatch(u, v)
+            for x in [u, v]:
+                if self.is_free(x):
+                    self.find_mate(x)
+
+
+    # v keeps the edge to u. If both are free, the edge is matched straight away, so that the matching stays maximal.
+    def keep(self, v, u):
+        self.kept[v].append(u)
+        self.kept_pointers[v][u] = len(self.kept[v]) - 1
+        if self.is_free(v):
+            self.add_free_keeper(u, v)
+            if self.is_free(u):
+                self.match(v, u)
+
+
+    # v stops keeping the edge to u, either because the edge is gone or because u now owns it alone.
+    def drop(self, v, u):
+        pos = self.kept_pointers[v][u]
+        last = self.kept[v][-1]
+        self.kept[v][pos] = last
+        self.kept_pointers[v][last] = pos
+        self.kept[v].pop()
+        del self.kept_pointers[v][u]
+        if self.is_free(v):
+            self.remove_free_keeper(u, v)
+
+
+    # Keeps the owned edges that v does not keep yet. These are the edges to its neighbours in N(v, <= l(v)).
+    def keep_owned(self, v):
+        for u in self.fractional.neighbours[v][self.fractional.level[v]]:
+            if u not in self.kept_pointers[v]:
+                self.keep(v, u)
+
+
+    def add_free_keeper(self, v, u):
+        self.free_keepers[v].append(u)
+        self.free_keeper_pointers[v][u] = len(self.free_keepers[v]) - 1
+
+
+    def remove_free_keeper(self, v, u):
+        pos = self.free_keeper_pointers[v][u]
+        last = self.free_keepers[v][-1]
+        self.free_keepers[v][pos] = last
+        self.free_keeper_pointers[v][last] = pos
+        self.free_keepers[v].pop()
+        del self.free_keeper_pointers[v][u]
+
+
+    # Called by fractionalalgo1 after v has moved a level, with the neighbourhood lists already updated. Moving up, v takes sole ownership
+    # of the edges to its neighbours at its old level, and shares those at its new level. Moving down, v gives up the edges to its neighbours
+    # at its old level, and shares those at its new level. Every edge keeps at least one owner throughout, so maximality is never lost.
+    # Only neighbours in N(v, <= l(v)) and v's own kept edges are concerned, and fractionalalgo1 has just gone through the former itself.
+    def level_changed(self, v, old_level):
+        level = self.fractional.level
+        if level[v] > old_level:
+            self.keep_owned(v)
+            for u in self.fractional.neighbours[v][self.fractional.level[v]]:
+                if level[u] == old_level and v in self.kept_pointers[u]:
+                    self.drop(u, v)
+        else:
+            for u in self.fractional.neighbours[v][self.fractional.level[v]]:
+                if level[u] == level[v] and v not in self.kept_pointers[u]:
+                    self.keep(u, v)
+            for u in list(self.kept[v]):
+                if level[u] > level[v]:
+                    self.drop(v, u)
+
+
+    # A matched node is no longer a free keeper of the nodes it keeps.
+    def match(self, u, v):
+        self.mates[u] = v
+        self.mates[v] = u
+        self.matching[min(u, v)] = max(u, v)
+        for x in [u, v]:
+            for y in self.kept[x]:
+                self.remove_free_keeper(y, x)
+
+
+    def unmatch(self, u, v):
+        self.mates[u] = None
+        self.mates[v] = None
+        del self.matching[min(u, v)]
+        for x in [u, v]:
+            for y in self.kept[x]:
+                self.add_free_keeper(y, x)
+
+
+    # v has just been freed. The edges it owns are checked one by one, and of the edges owned by its neighbours, those owned by free neighbours
+    # are listed in free_keepers[v].
+    def find_mate(self, v):
+        if self.stats != None:
+            self.stats.count("free_searches")
+            self.stats.count("neighbours_touched", len(self.kept[v]))
+        for u in self.kept[v]:
+            if self.is_free(u):
+                self.match(v, u)
+                return
+        if len(self.free_keepers[v]) != 0:
+            self.match(v, self.free_keepers[v][-1])
+
+
+    def is_free(self, v):
+        return self.mates[v] == None
+
+
+    # The fractional matching is written under its own prefix. The pointer maps and the mates are rebuilt from the lists and the matching.
+    def save(self, writer, prefix=""):
+        writer.scalars(prefix + "scalars", {"epsilon": self.epsilon, "n": self.n, "bip_cut": self.bip_cut})
+        self.fractional.save(writer, prefix + "fractional.")
+        writer.ragged(prefix + "kept", self.kept)
+        writer.ragged(prefix + "free_keepers", self.free_keepers)
+        writer.array(prefix + "matching_u", self.matching.keys())
+        writer.array(prefix + "matching_v", self.matching.values())
+
+    @classmethod
+    def load(cls, snapshot, prefix=""):
+        scalars = snapshot.scalars(prefix + "scalars")
+        graph = cls(scalars["epsilon"], scalars["n"], scalars["bip_cut"])
+        graph.fractional = fractionalalgo1.Algorithm.load(snapshot, prefix + "fractional.")
+        graph.fractional.on_level_change = graph.level_changed
+        graph.kept = snapshot.ragged(prefix + "kept")
+        graph.free_keepers = snapshot.ragged(prefix + "free_keepers")
+        for v in range(graph.n):
+            for i in range(len(graph.kept[v])):
+                graph.kept_pointers[v][graph.kept[v][i]] = i
+            for i in range(len(graph.free_keepers[v])):
+                graph.free_keeper_pointers[v][graph.free_keepers[v][i]] = i
+        graph.matching = dict(zip(snapshot.array(prefix + "matching_u"), snapshot.array(prefix + "matching_v")))
+        for u, v in graph.matching.items():
+            graph.mates[u] = v
+            graph.mates[v] = u
+        return graph
+
+
+    def toString(self):
+        self.fractional.toString()
+        print("matching:", self.matching)
+        print("matching of size {}".format(len(self.matching)))
+
+
+    # The vertex cover is that of the fractional matching, which is the same as for fractionalalgo1.
+    def vertex_cover(self):
+        return self.fractional.vertex_cover()
+
+    # The cover queries are answered by the fractional matching, whose cover the rounding keeps.
+    def matching_size(self):
+        return len(self.matching)
+
+    def fractional_weight(self):
+        return self.fractional.total_weight
+
+    def cover_size(self):
+        return self.fractional.cover_size()
+
+    def in_cover(self, v):
+        return self.fractional.in_cover(v)
+
+    def mate(self, v):
+        return self.mates[v]
+
+    def cover_nodes(self):
+        return self.fractional.cover_nodes()
+
+    def matched_edges(self):
+        return iter(self.matching.items())
@@ -1,4 +1,6 @@
-import math
+import math, time
+from batching import coalesce
+from dynamic_graph import DynamicGraph
 
 # A full implementation of the algorithm to compute deterministic (2+e)-approximate vertex covers in the dynamic setting.
 # Adapted from an algorithm for computing set covers.
@@ -8,129 +10,437 @@ import math
 # Accessible at: https://arxiv.org/pdf/1909.11600.pdf
 
 
-class Algorithm:
+# The state of an edge in the edge table. Real edges, i.e. the current input, are the active and passive ones.
+ACTIVE = 0
+PASSIVE = 1
+DEAD = 2
+
+
+class Algorithm(DynamicGraph):
 
 
 
     def __init__(self, epsilon, n):
         self.n = n
         self.epsilon = epsilon
-        self.L = 1 + math.ceil(math.log(n, 1 + self.epsilon))
+        self.L = self.levels(n)
         self.counters = [0 for i in range(self.L)]
         self.level = [0 for i in range(n)]
         self.node_weight = [0 for i in range(n)]
-        self.edge_weight = [[None if i == j else 0 for j in range(n)] for i in range(n)]
         self.tight_nodes = []
         self.tight_pointers = [None for i in range(n)]
         self.is_tight = [False for i in range(n)]
-        self.active_edges = [[[] for j in range(self.L)] for i in range(n)] # Adjacency list for active edges
-        self.active_pointers = [[None for j in range(n)] for i in range(n)] # Pointers for position of node in active edge set
-        self.passive_edges = [[[] for j in range(self.L)] for i in range(n)]
-        self.passive_pointers = [[None for j in range(n)] for i in range(n)] # Entry [u][v] corresponds to u's position in the adjacency list of v
-        self.dead_edges = [[[] for j in range(self.L)] for i in range(n)]
-        self.dead_pointers = [[None for j in range(n)] for i in range(n)]
-        self.real_input = [[[] for j in range(self.L)] for i in range(n)] # The union of active and passive edges
-        self.real_pointers = [[None for j in range(n)] for i in range(n)]
-
-
-
-    def is_tight(self, v):
-        return (1 + self.epsilon) ** -1 <= self.node_weight[v] and self.node_weight[v] <= 1
-
+        self.total_weight = 0 # The weight of the fractional matching, i.e. the sum of the weights of the real edges
+        self.stats = None # The work counters, see instrumentation.py
+
+        # The edge table. Each edge, dead ones included, has an id indexing the parallel columns below.
+        # Ids of edges that leave the table are recycled, so the columns never grow beyond the largest number of stored edges.
+        self.edge_u = []
+        self.edge_v = []
+        self.edge_weights = []
+        self.edge_levels = []
+        self.edge_states = []
+        self.edge_slots = [] # Position of the edge in self.edges[state][level]
+        self.edge_positions = [] # Entries 2e and 2e+1 hold the position of edge e in the incidence buckets of edge_u[e] and edge_v[e]
+        self.free_ids = []
+        self.edge_ids = [{} for i in range(n)] # Entry [u][v] is the id of the real edge (u, v)
+
+        # Swap-and-pop lists of edge ids. Level k+1 is only used transiently, while rebuilding the levels up to k.
+        self.edges = [[[] for j in range(self.L + 1)] for state in range(3)] # All edges with a given state and level
+        self.incident = [[] for i in range(n)] # Entry [v][l] holds the edges of every state at level l incident to v, see extend_incident
+
+    # The number of levels a graph on n nodes can need.
+    def levels(self, n):
+        return 1 + math.ceil(math.log(max(n, 1), 1 + self.epsilon))
+
+    # L is recomputed along with the number of nodes, and the counters of the new levels start out as if the levels had just been rebuilt.
+    def grow(self, n):
+        added = n - self.n
+        self.level.extend([0] * added)
+        self.node_weight.extend([0] * added)
+        self.tight_pointers.extend([None] * added)
+        self.is_tight.extend([False] * added)
+        self.edge_ids.extend({} for i in range(added))
+        self.incident.extend([] for i in range(added))
+        self.n = n
+        L = self.levels(n)
+        size = sum(len(self.edges[ACTIVE][level]) + len(self.edges[PASSIVE][level]) for level in range(self.L + 1))
+        self.counters.extend(self.epsilon * size for k in range(self.L, L))
+        for state in range(3):
+            self.edges[state].extend([] for k in range(self.L, L))
+        self.L = L
 
+    # A node only has incidence buckets up to the highest level it has had an edge at, and more are added when needed.
+    def extend_incident(self, node, level):
+        while len(self.incident[node]) <= level:
+            self.incident[node].append([])
 
-    def edge_weight(self, u, v):
-        return (1 + self.epsilon) ** (-max(self.level[u], self.level[v]))
 
 
     def edge_level(self, u, v):
         return max(self.level[u], self.level[v])
 
-    def set_edge_weight(self, u, v, weight):
-        self.edge_weight[u][v] = weight
-        self.edge_weight[v][u] = weight
-
-    def add_edge_unilateral(self, edges, pointers, u, v, level):
-        edges[u][level].append(v)
-        pointers[v][u] = len(edges[u][level]) - 1
-
-    def add_edge(self, edges, pointers, u, v, level):
-        
-        self.add_edge_unilateral(edges, pointers, u, v, level)
-        self.add_edge_unilateral(edges, pointers, v, u, level)
-
-
-    def remove_edge_unilateral(self, edges, pointers, u, v, level):
-        list = edges[u][level]
-        pos = pointers[v][u]
-        if pos != len(list) - 1:
-            last_element = list[-1]
-            list[pos] = last_element
-            pointers[last_element][u] = pos
+    def set_tight(self, v):
+        self.is_tight[v] = True
+        self.tight_nodes.append(v)
+        self.tight_pointers[v] = len(self.tight_nodes) - 1
+
+    def unset_tight(self, v):
+        pos = self.tight_pointers[v]
+        last = self.tight_nodes[-1]
+        self.tight_nodes[pos] = last
+        self.tight_pointers[last] = pos
+        self.tight_nodes.pop()
+        self.tight_pointers[v] = None
+        self.is_tight[v] = False
+
+    # A node is tight when its weight is at least 1/(1+e). Only a rebuild can lower the weight of a node, so only a rebuild unsets it.
+    def update_tight(self, v):
+        tight = self.node_weight[v] >= (1+self.epsilon)**-1
+        if tight and not self.is_tight[v]:
+            self.set_tight(v)
+        elif not tight and self.is_tight[v]:
+            self.unset_tight(v)
+
+    # Changes the weight of edge e, together with the weights of its endpoints and, for a real edge, the weight of the matching.
+    def set_weight(self, e, weight):
+        diff = weight - self.edge_weights[e]
+        self.edge_weights[e] = weight
+        self.node_weight[self.edge_u[e]] += diff
+        self.node_weight[self.edge_v[e]] += diff
+        if self.edge_states[e] != DEAD:
+            self.total_weight += diff
+
+    # Allocates an id for the edge (u, v), fills in its columns and places it into the level lists.
+    def new_edge(self, u, v, level, weight, state):
+        if len(self.free_ids) != 0:
+            e = self.free_ids.pop()
+            self.edge_u[e] = u
+            self.edge_v[e] = v
+            self.edge_weights[e] = weight
+            self.edge_levels[e] = level
+            self.edge_states[e] = state
+        else:
+            e = len(self.edge_u)
+            self.edge_u.append(u)
+            self.edge_v.append(v)
+            self.edge_weights.append(weight)
+            self.edge_levels.append(level)
+            self.edge_states.append(state)
+            self.edge_slots.append(None)
+            self.edge_positions.extend([None, None])
+        self.edge_ids[u][v] = e
+        self.edge_ids[v][u] = e
+        self.add_edge(e)
+        return e
+
+    # Places edge e into the list for its state and level, and into the incidence buckets of both endpoints.
+    def add_edge(self, e):
+        level = self.edge_levels[e]
+        list = self.edges[self.edge_states[e]][level]
+        list.append(e)
+        self.edge_slots[e] = len(list) - 1
+        for side, node in enumerate([self.edge_u[e], self.edge_v[e]]):
+            self.extend_incident(node, level)
+            bucket = self.incident[node][level]
+            bucket.append(e)
+            self.edge_positions[2*e + side] = len(bucket) - 1
+
+    # Removes edge e from its lists in constant time, by moving the last entry of each list into its place.
+    def remove_edge(self, e):
+        level = self.edge_levels[e]
+        list = self.edges[self.edge_states[e]][level]
+        pos = self.edge_slots[e]
+        last_edge = list[-1]
+        list[pos] = last_edge
+        self.edge_slots[last_edge] = pos
         list.pop()
-        pointers[v][u] = None
-
-    def remove_edge(self, edges, pointers, u, v, level):
-        if pointers[u][v] != None and pointers[v][u] != None:
-            self.remove_edge_unilateral(edges, pointers, u, v, level)
-            self.remove_edge_unilateral(edges, pointers, v, u, level)
+        for side, node in enumerate([self.edge_u[e], self.edge_v[e]]):
+            bucket = self.incident[node][level]
+            pos = self.edge_positions[2*e + side]
+            last_edge = bucket[-1]
+            bucket[pos] = last_edge
+            self.edge_positions[2*last_edge + (0 if self.edge_u[last_edge] == node else 1)] = pos
+            bucket.pop()
+
+    # Changes the state and level of edge e.
+    def move_edge(self, e, state, level):
+        self.remove_edge(e)
+        self.edge_states[e] = state
+        self.edge_levels[e] = level
+        self.add_edge(e)
+
+    # Drops edge e from the table altogether. Its id becomes available to later insertions.
+    def free_edge(self, e):
+        self.remove_edge(e)
+        self.free_ids.append(e)
 
     def insert(self, u, v):
+        if self.stats != None:
+            self.stats.begin("ins")
+        self.insert_edge(u, v)
+        if self.stats != None:
+            self.stats.end()
+
+    def insert_edge(self, u, v):
+        self.ensure_vertex(max(u, v))
         level = self.edge_level(u, v)
 
         if self.is_tight[u] or self.is_tight[v]:
-            self.add_edge(self.real_input, self.real_pointers, u, v, level)
-            self.add_edge(self.passive_edges, self.passive_pointers, u, v, level)
-            self.set_edge_weight(u, v, 0)
+            self.new_edge(u, v, level, 0, PASSIVE)
 
         else:
             weight = min(1 - self.node_weight[u], 1 - self.node_weight[v])
-            self.add_edge(self.real_input, self.real_pointers, u, v, level)
-            self.add_edge(self.passive_edges, self.passive_pointers, u, v, level)
-            self.set_edge_weight(u, v, weight)
+            self.new_edge(u, v, level, weight, PASSIVE)
+            self.total_weight += weight
             for node in [u,v]:
                 self.node_weight[node] += weight
                 if self.node_weight[node] >= (1+self.epsilon)**-1:
-                    self.is_tight[node] = True
-                    self.tight_nodes.append(node)
-                    self.tight_pointers[node] = len(self.tight_nodes) - 1
+                    self.set_tight(node)
 
 
 
+    # A deleted edge keeps its weight and level, and stays in the table as a dead edge until the next rebuild.
     def delete(self, u, v):
-        level = self.edge_level(u, v)
-        self.remove_edge(self.real_input, self.real_pointers, u, v, level)
-        self.remove_edge(self.active_edges, self.active_pointers, u, v, level)
-        self.remove_edge(self.passive_edges, self.passive_pointers, u, v, level)
-        self.add_edge(self.dead_edges, self.dead_pointers, u, v, level)
-
-        level = self.edge_level(u, v)
+        if self.stats != None:
+            self.stats.begin("del")
+        level = self.delete_edge(u, v)
         for k in range(self.L-1, level-1, -1):
             self.counters[k] -= 1
             if self.counters[k] <= 0:
                 self.rebuild(k)
-                return
-
-
+                break
+        if self.stats != None:
+            self.stats.end()
+
+    def delete_edge(self, u, v):
+        e = self.edge_ids[u].pop(v)
+        del self.edge_ids[v][u]
+        level = self.edge_levels[e]
+        self.total_weight -= self.edge_weights[e]
+        self.move_edge(e, DEAD, level)
+        return level
+
+    # Applies a batch of ("ins" or "del", u, v) updates, skipping those that cancel out within the batch.
+    # Every deletion still decrements the counters, but at most one rebuild runs, at the end, for the highest level whose counter ran out.
+    # That rebuild resets all the counters below it, so the counters end up as if the rebuilds had happened one update at a time.
+    def apply_batch(self, updates):
+        if self.stats != None:
+            self.stats.begin("batch")
+        rebuild_level = None
+        for operation, u, v in coalesce(updates):
+            if operation == "ins":
+                self.insert_edge(u, v)
+                continue
+            level = self.delete_edge(u, v)
+            for k in range(self.L-1, level-1, -1):
+                self.counters[k] -= 1
+                if self.counters[k] <= 0 and (rebuild_level == None or k > rebuild_level):
+                    rebuild_level = k
+        if rebuild_level != None:
+            self.rebuild(rebuild_level)
+        if self.stats != None:
+            self.stats.end()
+
+
+    # Rebuilds the levels 0 to k, as described in Section 5 of the paper. Every edge at these levels has both endpoints at level k or below,
+    # and these endpoints are the only nodes whose weights change, so the rebuild takes time proportional to the number of such edges, plus k.
     def rebuild(self, k):
-        ini_active = self.active_edges
-        ini_passive = self.passive_edges
-        ini_real = self.real_input
-        ini_dead = self.dead_edges
-        u = 0
-        for node in ini_real:
-            for v in ini_real[u][:k+1]:
-                ()#print(v)
-            
-
-        
+        if self.stats != None:
+            start = time.perf_counter_ns()
+        beta = 1 + self.epsilon
+        nodes = [] # The endpoints of the edges at levels 0 to k
+        in_rebuild = set()
+        active = []
+        passive = []
+
+        # Steps 1 and 2: dead edges leave the table, and their weights leave the weights of their endpoints.
+        for level in range(k+1):
+            dead = self.edges[DEAD][level]
+            while len(dead) != 0:
+                e = dead[-1]
+                self.set_weight(e, 0)
+                self.free_edge(e)
+                for node in [self.edge_u[e], self.edge_v[e]]:
+                    if node not in in_rebuild:
+                        in_rebuild.add(node)
+                        nodes.append(node)
+            active.extend(self.edges[ACTIVE][level])
+            passive.extend(self.edges[PASSIVE][level])
+        for e in active + passive:
+            for node in [self.edge_u[e], self.edge_v[e]]:
+                if node not in in_rebuild:
+                    in_rebuild.add(node)
+                    nodes.append(node)
+
+        # A node whose edges at these levels were all dead may not have buckets up to level k+1 yet.
+        for node in nodes:
+            self.extend_incident(node, k+1)
+
+        # Step 3: every node and edge involved moves up to level k+1. Active edges take the weight of that level, and passive edges lose theirs.
+        top_weight = beta**-(k+1)
+        for node in nodes:
+            self.level[node] = k+1
+        for e in passive:
+            self.set_weight(e, 0)
+            self.move_edge(e, PASSIVE, k+1)
+        for e in active:
+            self.set_weight(e, top_weight)
+            self.move_edge(e, ACTIVE, k+1)
+
+        # Step 4: a passive edge becomes active if both endpoints have room for the weight of level k+1.
+        # Otherwise it stays passive and fills up the endpoint with less room, which makes that endpoint tight.
+        for e in passive:
+            u = self.edge_u[e]
+            v = self.edge_v[e]
+            if self.node_weight[u] <= 1 - top_weight and self.node_weight[v] <= 1 - top_weight:
+                self.move_edge(e, ACTIVE, k+1)
+                self.set_weight(e, top_weight)
+            else:
+                self.set_weight(e, min(1 - self.node_weight[u], 1 - self.node_weight[v]))
+
+        # Step 5: the nodes that are not tight at level k+1 drop to level k, along with the edges between them, which are all active.
+        lower = [node for node in nodes if self.node_weight[node] < beta**-1]
+        for node in lower:
+            self.level[node] = k
+        for e in active + passive:
+            if self.level[self.edge_u[e]] == k and self.level[self.edge_v[e]] == k:
+                self.move_edge(e, ACTIVE, k)
+                self.set_weight(e, beta**-k)
+
+        # Step 6: the nodes at level k settle at their final levels.
+        self.fix_level(k, lower)
+
+        # Step 7: the counters for levels 0 to k are reset to e times the number of edges at or below each level.
+        size = 0
+        for level in range(k+1):
+            size += len(self.edges[ACTIVE][level]) + len(self.edges[PASSIVE][level])
+            self.counters[level] = self.epsilon * size
+
+        for node in nodes:
+            self.update_tight(node)
+
+        if self.stats != None:
+            self.stats.count("rebuilds")
+            self.stats.count("rebuild_size", len(active) + len(passive))
+            self.stats.count("rebuild_ns", time.perf_counter_ns() - start)
+
+
+    # The highest level i in [1, k] at which a node of weight w, with a edges at level k, still has weight at least 1/(1+e)
+    # once those edges are given the weight of level i. Returns 0 if there is no such level, or if the node has no edges at level k.
+    def target_level(self, w, a, k):
+        if a == 0:
+            return 0
+        beta = 1 + self.epsilon
+        bound = (beta**-1 - w) / a + beta**-k
+        i = k if bound <= beta**-k else max(0, min(k, math.floor(-math.log(bound, beta))))
+        while i > 0 and w + (beta**-i - beta**-k) * a < beta**-1:
+            i -= 1
+        while i < k and w + (beta**-(i+1) - beta**-k) * a >= beta**-1:
+            i += 1
+        return i
+
+
+    # FIX-LEVEL from Section 5. The given nodes, all at level k, are kept in buckets by target level and settled from the highest bucket down.
+    # Settling a node moves its remaining edges at level k down to its target level, which raises the weights of their other endpoints,
+    # so those endpoints are moved to the bucket of their new target. A target never exceeds the bucket being processed, so that
+    # the level of every edge stays the larger of the levels of its endpoints.
+    def fix_level(self, k, nodes):
+        beta = 1 + self.epsilon
+        alive = {node: len(self.incident[node][k]) for node in nodes} # The number of unsettled edges of each node at level k
+        buckets = [[] for i in range(k+1)]
+        target = {}
+        positions = {}
+        for node in nodes:
+            target[node] = self.target_level(self.node_weight[node], alive[node], k)
+            buckets[target[node]].append(node)
+            positions[node] = len(buckets[target[node]]) - 1
+        settled = set()
+
+        for i in range(k, -1, -1):
+            bucket = buckets[i]
+            while len(bucket) != 0:
+                s = bucket.pop()
+                del positions[s]
+                self.level[s] = i
+                for e in list(self.incident[s][k]):
+                    if e in settled:
+                        continue
+                    settled.add(e)
+                    t = self.edge_v[e] if self.edge_u[e] == s else self.edge_u[e]
+                    if i != k:
+                        self.move_edge(e, ACTIVE, i)
+                        self.set_weight(e, beta**-i)
+                    alive[t] -= 1
+
+                    # Moves t to the bucket of its new target, by swapping it with the last node of its current bucket.
+                    old_bucket = buckets[target[t]]
+                    pos = positions[t]
+                    last = old_bucket[-1]
+                    old_bucket[pos] = last
+                    positions[last] = pos
+                    old_bucket.pop()
+                    target[t] = min(i, self.target_level(self.node_weight[t], alive[t], k))
+                    buckets[target[t]].append(t)
+                    positions[t] = len(buckets[target[t]]) - 1
+
+
+
+
+    # The edge table is written column by column. The map from endpoints to edge ids is rebuilt from the columns, and the tight flags
+    # and pointers from the list of tight nodes.
+    def save(self, writer, prefix=""):
+        writer.scalars(prefix + "scalars", {"epsilon": self.epsilon, "n": self.n, "total_weight": self.total_weight})
+        writer.array(prefix + "counters", self.counters, "d")
+        writer.array(prefix + "level", self.level)
+        writer.array(prefix + "node_weight", self.node_weight, "d")
+        writer.array(prefix + "tight_nodes", self.tight_nodes)
+        for column in ["edge_u", "edge_v", "edge_levels", "edge_states", "edge_slots", "edge_positions", "free_ids"]:
+            writer.array(prefix + column, getattr(self, column))
+        writer.array(prefix + "edge_weights", self.edge_weights, "d")
+        writer.nested(prefix + "edges", self.edges)
+        writer.nested(prefix + "incident", self.incident)
+
+    @classmethod
+    def load(cls, snapshot, prefix=""):
+        scalars = snapshot.scalars(prefix + "scalars")
+        graph = cls(scalars["epsilon"], scalars["n"])
+        graph.total_weight = scalars["total_weight"]
+        graph.counters = snapshot.array(prefix + "counters")
+        graph.level = snapshot.array(prefix + "level")
+        graph.node_weight = snapshot.array(prefix + "node_weight")
+        for v in snapshot.array(prefix + "tight_nodes"):
+            graph.set_tight(v)
+        for column in ["edge_u", "edge_v", "edge_levels", "edge_states", "edge_slots", "edge_positions", "free_ids"]:
+            setattr(graph, column, snapshot.array(prefix + column))
+        graph.edge_weights = snapshot.array(prefix + "edge_weights")
+        graph.edges = snapshot.nested(prefix + "edges")
+        graph.incident = snapshot.nested(prefix + "incident")
+        free = set(graph.free_ids)
+        for e in range(len(graph.edge_u)):
+            if e not in free and graph.edge_states[e] != DEAD:
+                graph.edge_ids[graph.edge_u[e]][graph.edge_v[e]] = e
+                graph.edge_ids[graph.edge_v[e]][graph.edge_u[e]] = e
+        return graph
 
 
     def toString(self):
-        print(self.real_input)
-        #print(self.active_edges)
-        #print(self.passive_edges)
-        #print(self.dead_edges)
+        print([[(self.edge_u[e], self.edge_v[e]) for state in [ACTIVE, PASSIVE] for e in self.edges[state][level]] for level in range(self.L + 1)])
 
+    # The tight nodes form the vertex cover. A copy is returned, so that callers cannot corrupt the list of tight nodes.
     def vertex_cover(self):
-        print(self.tight_nodes)
\ No newline at end of file
+        return list(self.tight_nodes)
+
+    # The cover queries read the tight nodes. There is no integral matching to query.
+    def fractional_weight(self):
+        return self.total_weight
+
+    def cover_size(self):
+        return len(self.tight_nodes)
+
+    def in_cover(self, v):
+        return self.is_tight[v]
+
+    def cover_nodes(self):
+        return iter(self.tight_nodes)
+
@@ -1,38 +1,54 @@
-from typing import Match
-from pytrees import AVLTree
-from heapq_max import *
-import math
+from array import array
+from snapshot import Snapshotted
+from dynamic_graph import Growable
 
 #Computes a maximal matching and takes the set of endpoints as the 2-approximate vertex cover.
 
-class Vertex_Cover:
+class Vertex_Cover(Growable, Snapshotted):
     def __init__(self, n):
-        self.matching = AVLTree()
+        self.n = n
+        self.matching = set() # The matched edges, as (min, max) pairs
         self.mate = [None for i in range(n)]
-        self.neighbours = [AVLTree() for i in range(n)]
+        self.neighbours = [[] for i in range(n)]
+        self.neighbour_pointers = [{} for i in range(n)] # Entry [u][v] points to u's position in v's neighbour list, and only exists while (u, v) is an edge
         self.degree = [0 for i in range(n)]
-        self.free_nbhrs = [F(n) for i in range(n)]
-        self.free_v_heap = AVLTree()
-        for i in range(n):
-            self.free_v_heap.insert((0,i))
+
+        # Bit i of free_nbhrs[v] is set when neighbours[v][i] is free. Each bitset is an array of 64 bit words, one per 64 neighbours,
+        # which grows and shrinks with the degree of v and is updated in place, so that marking a neighbour free or matched takes
+        # constant time. free_counts[v] is the number of bits set, so that a node without free neighbours is answered without a scan.
+        self.free_nbhrs = [array("Q") for i in range(n)]
+        self.free_counts = [0 for i in range(n)]
+        self.words = 0 # The number of bitset words read or written by the last update
+        self.free_nodes = Free_Buckets(n)
         self.num_edges = 0
         self.vertex_cover = []
         self.vc_pointers = [None for i in range(n)]
+        self.on_cover_change = None # Called as on_cover_change(v, covered) whenever v joins or leaves the vertex cover
+        self.stats = None # The work counters of the driver, see instrumentation.py
+
+    def grow(self, n):
+        added = n - self.n
+        self.mate.extend([None] * added)
+        self.neighbours.extend([] for i in range(added))
+        self.neighbour_pointers.extend({} for i in range(added))
+        self.degree.extend([0] * added)
+        self.free_nbhrs.extend(array("Q") for i in range(added))
+        self.free_counts.extend([0] * added)
+        self.vc_pointers.extend([None] * added)
+        self.free_nodes.grow(n)
+        self.n = n
 
     def insert(self, u, v):
-        self.neighbours[u].insert(v)
-        self.neighbours[v].insert(u)
+        self.ensure_vertex(max(u, v))
+        self.words = 0
+        self.add_neighbour(u, v)
+        self.add_neighbour(v, u)
         self.degree[u] += 1
         self.degree[v] += 1
         self.num_edges += 1
-        if self.is_free(u):
-            self.free_v_heap.delete((self.degree[u]-1, u))
-            self.free_v_heap.insert((self.degree[u], u))
-            self.free_nbhrs[v].insert(u)
-        if self.is_free(v):
-            self.free_v_heap.delete((self.degree[v]-1, v))
-            self.free_v_heap.insert((self.degree[v], v))
-            self.free_nbhrs[u].insert(v)
+        for node in [u, v]:
+            if self.is_free(node):
+                self.free_nodes.move(node, self.degree[node]-1, self.degree[node])
         if self.is_free(u) and self.is_free(v):
             self.match(u, v)
         else:
@@ -42,96 +58,233 @@ class Vertex_Cover:
                 self.handle_one_free(v, u)
 
 
+    # Places v at the end of u's neighbour list, and marks it in u's bitset if it is free. A word is added every 64 neighbours.
+    def add_neighbour(self, u, v):
+        pos = len(self.neighbours[u])
+        self.neighbour_pointers[v][u] = pos
+        self.neighbours[u].append(v)
+        if pos & 63 == 0:
+            self.free_nbhrs[u].append(0)
+        if self.is_free(v):
+            self.set_bit(u, pos)
+
+    # Removes v from u's neighbour list in constant time, by moving the last neighbour, and its bit, into v's place.
+    # The last word is dropped once no neighbour uses it.
+    def remove_neighbour(self, u, v):
+        pos = self.neighbour_pointers[v][u]
+        last = len(self.neighbours[u]) - 1
+        words = self.free_nbhrs[u]
+        if words[pos >> 6] >> (pos & 63) & 1:
+            self.clear_bit(u, pos)
+        if pos != last:
+            w = self.neighbours[u][last]
+            self.neighbours[u][pos] = w
+            self.neighbour_pointers[w][u] = pos
+            if words[last >> 6] >> (last & 63) & 1:
+                self.clear_bit(u, last)
+                self.set_bit(u, pos)
+        self.neighbours[u].pop()
+        if last & 63 == 0:
+            words.pop()
+        del self.neighbour_pointers[v][u]
+
+    def set_bit(self, u, pos):
+        self.free_nbhrs[u][pos >> 6] |= 1 << (pos & 63)
+        self.free_counts[u] += 1
+        self.words += 1
+
+    def clear_bit(self, u, pos):
+        self.free_nbhrs[u][pos >> 6] &= WORD ^ (1 << (pos & 63))
+        self.free_counts[u] -= 1
+        self.words += 1
+
+    # Sets or clears the bit of v in the bitset of each of its neighbours, when v becomes free or matched.
+    # This is set_free or unset_free for every neighbour, written out since it is the inner loop of every change to the matching.
+    def mark_neighbours(self, v, free):
+        pointers = self.neighbour_pointers[v]
+        free_nbhrs = self.free_nbhrs
+        counts = self.free_counts
+        for x in self.neighbours[v]:
+            pos = pointers[x]
+            if free:
+                free_nbhrs[x][pos >> 6] |= 1 << (pos & 63)
+                counts[x] += 1
+            else:
+                free_nbhrs[x][pos >> 6] &= WORD ^ (1 << (pos & 63))
+                counts[x] -= 1
+        self.words += len(self.neighbours[v])
+
+    # Marks v as a free neighbour of u.
+    def set_free(self, v, u):
+        self.set_bit(u, self.neighbour_pointers[v][u])
+
+    # Marks v as a matched neighbour of u.
+    def unset_free(self, v, u):
+        self.clear_bit(u, self.neighbour_pointers[v][u])
+
+    # Returns a free neighbour of u other than exclude, or None if there is none. The words are scanned from the first one
+    # only when u has a free neighbour to find, and the lowest set bit of the first non-zero word gives it.
+    def get_free(self, u, exclude=None):
+        count = self.free_counts[u]
+        skip = None
+        if exclude != None and self.is_free(exclude) and u in self.neighbour_pointers[exclude]:
+            skip = self.neighbour_pointers[exclude][u]
+            count -= 1
+        if count == 0:
+            return None
+        for i, word in enumerate(self.free_nbhrs[u]):
+            self.words += 1
+            if skip != None and skip >> 6 == i:
+                word &= WORD ^ (1 << (skip & 63))
+            if word != 0:
+                return self.neighbours[u][(i << 6) + (word & -word).bit_length() - 1]
+
 
+    # u is free and v is matched to z. If z has another free neighbour x, the path u-v-z-x is augmenting,
+    # and the matched edge (v, z) is replaced by (u, v) and (z, x).
     def handle_one_free(self, u, v):
         z = self.mate[v]
-        self.free_nbhrs[z].delete(u)
-        if self.free_nbhrs[z].has_free():
+        x = self.get_free(z, u)
+        if x != None:
             self.delete_from_matching((min(v,z), max(v,z)))
             self.match(u, v)
-            self.match(z, self.free_nbhrs[z].get_free())
-            
-        else:
-            for w in self.free_nbhrs[u].nbhrs:
-                self.free_nbhrs[w].insert(u)
+            self.match(z, x)
 
     def delete(self, u, v):
-        
+        self.words = 0
+
         def match_loop(node):
-            if self.free_nbhrs[node].has_free():
-                self.match(node, self.free_nbhrs[node].get_free())
+            if self.stats != None:
+                self.stats.count("free_searches")
+            x = self.get_free(node)
+            if x != None:
+                self.match(node, x)
             else:
                 if self.degree[node] > (2*self.num_edges)**0.5:
                     node = self.surrogate(node)
-                    match_loop(node)
+                    if node != None:
+                        match_loop(node)
                 else:
                     self.aug_path(node)
 
-        self.neighbours[u].delete(v)
-        self.neighbours[v].delete(u)
+        self.remove_neighbour(u, v)
+        self.remove_neighbour(v, u)
         self.degree[u] -= 1
         self.degree[v] -= 1
         self.num_edges -= 1
         if self.mate[u] != v:
-            if self.is_free(u):
-                self.free_nbhrs[v].delete(u)
-            if self.is_free(v):
-                self.free_nbhrs[u].delete(v)
-        elif self.mate[u] == v:
+            for node in [u, v]:
+                if self.is_free(node):
+                    self.free_nodes.move(node, self.degree[node]+1, self.degree[node])
+        else:
             self.delete_from_matching((u, v) if u < v else (v, u))
             for node in [u,v]:
-                match_loop(node)
+                if self.is_free(node):
+                    match_loop(node)
+
+        # The deletion lowers the degree threshold, which may leave a free node of high degree. The free node of maximum degree is the
+        # one to check, and at most one is handled per deletion, so that the work stays that of a single search.
+        node = self.free_nodes.max_degree()
+        if node != None and self.degree[node] > (2*self.num_edges)**0.5:
+            match_loop(node)
+
+
 
-        
-    
 
     def match(self, u, v):
-        self.matching.insert((u, v) if u < v else (v, u))
+        self.matching.add((u, v) if u < v else (v, u))
         for node in [u, v]:
             self.vertex_cover.append(node)
             self.vc_pointers[node] = len(self.vertex_cover) - 1
-        self.free_v_heap.delete((self.degree[u], u))
-        self.free_v_heap.delete((self.degree[u], v))
+            if self.on_cover_change != None:
+                self.on_cover_change(node, True)
+        self.free_nodes.delete(u, self.degree[u])
+        self.free_nodes.delete(v, self.degree[v])
         for w in [u,v]:
-            for x in self.neighbours[w].inOrder():
-                self.free_nbhrs[x].delete(w)
+            self.mark_neighbours(w, False)
         self.mate[u] = v
         self.mate[v] = u
 
 
+    # v has a high degree and no free neighbours. It takes the place of the mate of a neighbour w whose mate z has a low degree,
+    # and z, now free, is returned to look for a new mate. Returns None if every neighbour's mate has a high degree.
     def surrogate(self, v):
-        z = None
+        if self.stats != None:
+            self.stats.count("surrogates")
+            self.stats.count("neighbours_touched", len(self.neighbours[v]))
         for w in self.neighbours[v]:
-            z = self.mate(w)
-            if z != None and self.degree[z] <= (2*m)**0.5:
-                break
-        self.delete_from_matching((w, z))
-        self.match(v, w)
-        return z
+            z = self.mate[w]
+            if z != None and self.degree[z] <= (2*self.num_edges)**0.5:
+                self.delete_from_matching((min(w,z), max(w,z)))
+                self.match(v, w)
+                return z
+        return None
 
     def is_free(self, v):
         return self.mate[v] == None
 
+    def in_cover(self, v):
+        return self.vc_pointers[v] != None
+
+    # The pointer maps and degrees are rebuilt from the neighbour lists, and the free-neighbour bitsets from the mates.
+    # The buckets of free nodes are written as they are, so that a restored cover lists its free nodes in the same order.
+    def save(self, writer, prefix=""):
+        writer.scalars(prefix + "scalars", {"n": self.n, "num_edges": self.num_edges})
+        writer.ragged(prefix + "neighbours", self.neighbours)
+        writer.array(prefix + "mate", self.mate)
+        writer.array(prefix + "matching_u", [edge[0] for edge in self.matching])
+        writer.array(prefix + "matching_v", [edge[1] for edge in self.matching])
+        writer.array(prefix + "vertex_cover", self.vertex_cover)
+        writer.ragged(prefix + "free_nodes", self.free_nodes.buckets)
+
+    @classmethod
+    def load(cls, snapshot, prefix=""):
+        scalars = snapshot.scalars(prefix + "scalars")
+        n = scalars["n"]
+        vc = cls(n)
+        vc.num_edges = scalars["num_edges"]
+        vc.neighbours = snapshot.ragged(prefix + "neighbours")
+        vc.mate = snapshot.nodes(prefix + "mate")
+        for u in range(n):
+            neighbours = vc.neighbours[u]
+            vc.degree[u] = len(neighbours)
+            vc.free_nbhrs[u] = array("Q", bytes(8 * ((len(neighbours) + 63) // 64)))
+            for i in range(len(neighbours)):
+                vc.neighbour_pointers[neighbours[i]][u] = i
+                if vc.mate[neighbours[i]] == None:
+                    vc.set_bit(u, i)
+        vc.words = 0
+        vc.matching = set(zip(snapshot.array(prefix + "matching_u"), snapshot.array(prefix + "matching_v")))
+        vc.vertex_cover = snapshot.array(prefix + "vertex_cover")
+        for i in range(len(vc.vertex_cover)):
+            vc.vc_pointers[vc.vertex_cover[i]] = i
+        vc.free_nodes.buckets = snapshot.ragged(prefix + "free_nodes")
+        vc.free_nodes.positions = [None for i in range(n)]
+        for degree, bucket in enumerate(vc.free_nodes.buckets):
+            for i in range(len(bucket)):
+                vc.free_nodes.positions[bucket[i]] = i
+            if len(bucket) != 0:
+                vc.free_nodes.top = degree
+        return vc
+
+    # v is free, has no free neighbours and a low degree. Looks for an augmenting path v-w-z-x through the mate z of a neighbour w.
     def aug_path(self, v):
-        x = None
-        for w in self.neighbours[v].inOrder():
+        if self.stats != None:
+            self.stats.count("aug_paths")
+            self.stats.count("neighbours_touched", len(self.neighbours[v]))
+        for w in self.neighbours[v]:
             z = self.mate[w]
-            if z != None and self.free_nbhrs[z].has_free():
-                x = self.free_nbhrs[w].get_free()
-                break
-        if x != None:
-            self.delete_from_matching((min(w,z), max(w,z)))
-            self.match(v, w)
-            self.match(z, x)
-            
-        else:
-            for w in self.neighbours[v].inOrder():
-                self.free_nbhrs[w].insert(v)
-                self.free_v_heap.insert((self.degree[v], v))
-                self.mate[v] = None
+            if z != None:
+                x = self.get_free(z, v)
+                if x != None:
+                    self.delete_from_matching((min(w,z), max(w,z)))
+                    self.match(v, w)
+                    self.match(z, x)
+                    return
 
+    # Unmatches an edge. Its endpoints become free, so they rejoin the free nodes and are marked free in their neighbours' bitsets.
     def delete_from_matching(self, edge):
-        self.matching.delete(edge)
+        self.matching.discard(edge)
         for node in edge:
             pos = self.vc_pointers[node]
             if pos != len(self.vertex_cover) - 1:
@@ -140,43 +293,78 @@ class Vertex_Cover:
                 self.vc_pointers[z] = pos
             self.vertex_cover.pop()
             self.vc_pointers[node] = None
-        
+            if self.on_cover_change != None:
+                self.on_cover_change(node, False)
+            self.mate[node] = None
+            self.free_nodes.insert(node, self.degree[node])
+            self.mark_neighbours(node, True)
+
+
+WORD = (1 << 64) - 1
 
-class F:
+
+# The free nodes, bucketed by degree. Each bucket is a swap-and-pop list, so a node moves to a neighbouring bucket in constant time
+# when its degree changes by one. top is the highest non-empty bucket, or 0, so a free node of maximum degree is found in constant time.
+# A move shifts top by at most one. When a matched node leaves the top bucket, top is lowered past the empty buckets below it; each
+# step down undoes a step up, which was paid for by a move, or by freeing a node of that degree, which marks as many neighbours free.
+class Free_Buckets:
     def __init__(self, n):
-        self.size = math.ceil(n**0.5)
-        self.nbhrs = []
-        self.pointers = [None for i in range(n)]
-        self.free_nbhrs = [False for j in range(n)]
-        self.counter = [0 for i in range(self.size)]
-        self.num_nbhrs_free = 0
-
-    def insert(self, v):
-        self.free_nbhrs[v] = True
-        #self.nbhrs.append(v)
-        #self.pointers[v] = len(self.nbhrs) - 1
-        pos = math.floor(v/self.size)
-        self.counter[pos] += 1
-        self.num_nbhrs_free += 1
-
-    def delete(self, v):
-        self.free_nbhrs[v] = False
-        #if self.pointers[v] != len(self.nbhrs) - 1:
-            #node = self.nbhrs[-1]
-            #self.nbhrs[self.pointers[v]] = node
-            #self.pointers[node] = self.pointers[v]
-        #self.nbhrs.pop()
-        #self.pointers[v] = None
-        pos = math.floor(v/self.size)
-        self.counter[pos] -= 1
-        self.num_nbhrs_free -= 1
-
-    def has_free(self):
-        return self.num_nbhrs_free > 0
-
-    def get_free(self):
-        for i in range(len(self.counter)):
-            if self.counter[i] > 0:
-                for j in range(i*self.size, (i+1)*self.size):
-                    if self.free_nbhrs[j] == True:
-                        return j
\ No newline at end of file
+        self.buckets = [[i for i in range(n)]] # Entry [d] lists the free nodes of degree d; the list grows with the highest degree seen
+        self.positions = [i for i in range(n)] # The position of each free node in its bucket
+        self.top = 0
+
+    def insert(self, v, degree):
+        while len(self.buckets) <= degree:
+            self.buckets.append([])
+        self.buckets[degree].append(v)
+        self.positions[v] = len(self.buckets[degree]) - 1
+        if degree > self.top:
+            self.top = degree
+
+    def delete(self, v, degree):
+        self.remove(v, degree)
+        self.lower_top()
+
+    # The new nodes are free and have degree 0.
+    def grow(self, n):
+        for v in range(len(self.positions), n):
+            self.positions.append(None)
+            self.insert(v, 0)
+
+    # The degree changes by one, so top either rises to the new bucket, or falls to it when v leaves the top bucket empty.
+    # This is remove and insert written out, since every update moves the free nodes among its endpoints.
+    def move(self, v, old_degree, new_degree):
+        positions = self.positions
+        bucket = self.buckets[old_degree]
+        last = bucket.pop()
+        if last != v:
+            pos = positions[v]
+            bucket[pos] = last
+            positions[last] = pos
+        if new_degree == len(self.buckets):
+            self.buckets.append([])
+        target = self.buckets[new_degree]
+        positions[v] = len(target)
+        target.append(v)
+        if new_degree > self.top:
+            self.top = new_degree
+        elif old_degree == self.top and len(bucket) == 0:
+            self.top = new_degree
+
+    def remove(self, v, degree):
+        bucket = self.buckets[degree]
+        pos = self.positions[v]
+        last = bucket[-1]
+        bucket[pos] = last
+        self.positions[last] = pos
+        bucket.pop()
+        self.positions[v] = None
+
+    def lower_top(self):
+        while self.top > 0 and len(self.buckets[self.top]) == 0:
+            self.top -= 1
+
+    # A free node of maximum degree, or None if every node is matched.
+    def max_degree(self):
+        bucket = self.buckets[self.top]
+        return bucket[-1] if len(bucket) != 0 else None
@@ -1,31 +1,54 @@
 import math
+from snapshot import Snapshotted
+from dynamic_graph import Growable
 
 
-class Vertex_Cover:
+class Vertex_Cover(Growable, Snapshotted):
     def __init__(self, n, epsilon):
         self.n = n
         self.epsilon = epsilon
         self.num_edges = 0
         self.D = 0
+        self.D_level = None # The bit length of num_edges when D was last computed
+        self.cursor = [0 for i in range(n)] # Entry [v] is the position in v's adjacency list where the next scan for a free neighbour starts
+        self.scanned = 0 # The number of neighbours examined by the last update, which is at most 2D
         self.edges = [[] for i in range(n)]
-        self.edge_pointers = [[None for j in range(n)] for i in range(n)]
+        self.edge_pointers = [{} for i in range(n)] # Entry [u][v] points to u's position in v's adjacency list
         self.degree = [0 for i in range(n)]
         self.matching = []
-        self.matching_pointers = [[None for j in range(n)] for i in range(n)]
+        self.matching_pointers = {} # Maps each matched edge (min, max) to its position in the matching list
         self.mate = [None for i in range(n)]
         self.vertex_cover = []
         self.vc_pointers = [None for i in range(n)]
+        self.on_cover_change = None # Called as on_cover_change(v, covered) whenever v joins or leaves the vertex cover
         self.c = 0
+        self.stats = None # The work counters of the driver, see instrumentation.py
 
 
+    # D = 8 sqrt(m) / e, where m is rounded up to a power of two, so that D only changes when m crosses a power of two.
     def update_D(self):
-        self.D = math.ceil(8 * (self.num_edges)**0.5 / self.epsilon)
+        level = self.num_edges.bit_length()
+        if level != self.D_level:
+            self.D_level = level
+            self.D = math.ceil(8 * (1 << level)**0.5 / self.epsilon)
 
     def insert_unilateral(self, u, v):
         self.edges[u].append(v)
         self.edge_pointers[v][u] = len(self.edges[u]) - 1
 
+    def grow(self, n):
+        added = n - self.n
+        self.cursor.extend([0] * added)
+        self.edges.extend([] for i in range(added))
+        self.edge_pointers.extend({} for i in range(added))
+        self.degree.extend([0] * added)
+        self.mate.extend([None] * added)
+        self.vc_pointers.extend([None] * added)
+        self.n = n
+
     def insert(self, u, v):
+        self.ensure_vertex(max(u, v))
+        self.scanned = 0
         self.insert_unilateral(u, v)
         self.insert_unilateral(v, u)
         self.num_edges += 1
@@ -35,12 +58,25 @@ class Vertex_Cover:
         else:
             self.handle_free(u, v)
 
+    # A free endpoint examines up to D of its neighbours for a free one, resuming where its last scan stopped and wrapping around
+    # at the end of its adjacency list, so that repeated scans look at fresh neighbours rather than the same matched prefix.
     def handle_free(self, u, v):
         for w in [u,v]:
             if self.is_free(w):
-                for neighbour in range(min(self.D, len(self.edges[w]))):
+                edges = self.edges[w]
+                for i in range(min(self.D, len(edges))):
+                    if self.cursor[w] >= len(edges):
+                        self.cursor[w] = 0
+                    neighbour = edges[self.cursor[w]]
+                    self.cursor[w] += 1
+                    self.scanned += 1
                     if self.is_free(neighbour):
                         self.match(w, neighbour)
+                        break
+                if self.stats != None:
+                    self.stats.count("free_searches")
+        if self.stats != None:
+            self.stats.count("neighbours_touched", self.scanned)
 
     def delete_unilateral(self, u, v):
         pos = self.edge_pointers[u][v]
@@ -48,9 +84,10 @@ class Vertex_Cover:
         self.edges[v][pos] = w
         self.edge_pointers[w][v] = pos
         self.edges[v].pop()
-        self.edge_pointers[v][u] = 0
+        del self.edge_pointers[u][v]
     
     def delete(self, u, v):
+        self.scanned = 0
         self.delete_unilateral(u, v)
         self.delete_unilateral(v, u)
         self.num_edges -= 1
@@ -62,6 +99,8 @@ class Vertex_Cover:
     def insert_vc(self, v):
         self.vertex_cover.append(v)
         self.vc_pointers[v] = len(self.vertex_cover) - 1
+        if self.on_cover_change != None:
+            self.on_cover_change(v, True)
 
     def delete_vc(self, v):
         pos = self.vc_pointers[v]
@@ -70,27 +109,67 @@ class Vertex_Cover:
         self.vc_pointers[w] = pos
         self.vertex_cover.pop()
         self.vc_pointers[v] = None
+        if self.on_cover_change != None:
+            self.on_cover_change(v, False)
 
     def match(self, u, v):
         edge = (min(u, v), max(u, v))
         self.matching.append(edge)
-        self.matching_pointers[edge[0]][edge[1]] = len(self.matching) - 1
+        self.matching_pointers[edge] = len(self.matching) - 1
         self.mate[u] = v
         self.mate[v] = u
-        self.vertex_cover.append(u)
         self.insert_vc(u)
         self.insert_vc(v)
 
     def unmatch(self, u, v):
         edge = (min(u, v), max(u, v))
-        pos = self.matching_pointers[edge[0]][edge[1]]
+        pos = self.matching_pointers[edge]
         last_edge = self.matching[-1]
         self.matching[pos] = last_edge
-        self.matching_pointers[last_edge[0]][last_edge[1]] = pos
+        self.matching_pointers[last_edge] = pos
         self.matching.pop()
-        self.matching_pointers[edge[0]][edge[1]]
+        del self.matching_pointers[edge]
         self.mate[u] = None
         self.mate[v] = None
+        self.delete_vc(u)
+        self.delete_vc(v)
+
+    def in_cover(self, v):
+        return self.vc_pointers[v] != None
+
+    # The pointer maps are rebuilt from the adjacency lists, the matching and the vertex cover.
+    def save(self, writer, prefix=""):
+        writer.scalars(prefix + "scalars", {"n": self.n, "epsilon": self.epsilon, "num_edges": self.num_edges, "D": self.D,
+                                            "D_level": self.D_level, "scanned": self.scanned, "c": self.c})
+        writer.ragged(prefix + "edges", self.edges)
+        writer.array(prefix + "cursor", self.cursor)
+        writer.array(prefix + "mate", self.mate)
+        writer.array(prefix + "matching_u", [edge[0] for edge in self.matching])
+        writer.array(prefix + "matching_v", [edge[1] for edge in self.matching])
+        writer.array(prefix + "vertex_cover", self.vertex_cover)
+
+    @classmethod
+    def load(cls, snapshot, prefix=""):
+        scalars = snapshot.scalars(prefix + "scalars")
+        vc = cls(scalars["n"], scalars["epsilon"])
+        vc.num_edges = scalars["num_edges"]
+        vc.D = scalars["D"]
+        vc.D_level = scalars["D_level"]
+        vc.scanned = scalars["scanned"]
+        vc.c = scalars["c"]
+        vc.edges = snapshot.ragged(prefix + "edges")
+        for u in range(vc.n):
+            for i in range(len(vc.edges[u])):
+                vc.edge_pointers[vc.edges[u][i]][u] = i
+        vc.cursor = snapshot.array(prefix + "cursor")
+        vc.mate = snapshot.nodes(prefix + "mate")
+        vc.matching = list(zip(snapshot.array(prefix + "matching_u"), snapshot.array(prefix + "matching_v")))
+        for i in range(len(vc.matching)):
+            vc.matching_pointers[vc.matching[i]] = i
+        vc.vertex_cover = snapshot.array(prefix + "vertex_cover")
+        for i in range(len(vc.vertex_cover)):
+            vc.vc_pointers[vc.vertex_cover[i]] = i
+        return vc
 
     def is_free(self, v):
         return self.mate[v] == None
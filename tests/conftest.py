@@ -0,0 +1,6 @@
+import os, sys
+
+# The tests import the algorithms the way the scripts in common/ do, through algorithms.load_algorithm.
+COMMON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common")
+if COMMON not in sys.path:
+    sys.path.insert(0, COMMON)
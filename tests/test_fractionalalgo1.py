@@ -0,0 +1,74 @@
+import pytest
+from algorithms import load_algorithm
+from workloads import WORKLOADS
+from batching import chunked
+
+fractionalalgo1 = load_algorithm("fractional1")
+
+UPDATES = 2000
+
+
+# The neighbourhood lists of v are indexed by level: a neighbour u sits in the list at max(l(u), l(v)), at the position its
+# pointer gives, and the lists below l(v) are empty. The weights are those of Invariant 2.4's edge weights.
+def check(graph, edges):
+    for v in range(graph.n):
+        lists = graph.neighbours[v]
+        assert len(lists) > graph.level[v]
+        for i in range(graph.level[v]):
+            assert len(lists[i]) == 0, (v, i)
+        for i in range(graph.level[v], len(lists)):
+            for pos, u in enumerate(lists[i]):
+                assert graph.bucket_position(u, v) == i and graph.nbhd_pointers[u][v] == pos, (v, u)
+        assert sum(len(bucket) for bucket in lists) == len(graph.nbhd_pointers[v])
+    for u, v in edges:
+        assert u in graph.nbhd_pointers[v] and v in graph.nbhd_pointers[u]
+    for v in range(graph.n):
+        weight = sum(graph.edge_weight(u, v) for u in graph.nbhd_pointers[v])
+        assert graph.weight[v] == pytest.approx(weight), v
+    assert graph.total_weight == pytest.approx(sum(graph.edge_weight(u, v) for u, v in edges))
+
+
+@pytest.mark.parametrize("model", sorted(WORKLOADS))
+@pytest.mark.parametrize("epsilon", [0.1, 0.5])
+def test_level_lists_stay_consistent(model, epsilon):
+    graph = fractionalalgo1.Algorithm(epsilon, 1)
+    edges = set()
+    for operation, u, v in WORKLOADS[model](60, 0, 1).updates(UPDATES):
+        if operation == "ins":
+            graph.insert(u, v)
+            edges.add((u, v))
+        else:
+            graph.delete(u, v)
+            edges.discard((u, v))
+        check(graph, edges)
+
+
+# A level change merges or splits two lists in place, so a node only gets a new list when it or a neighbour reaches a level
+# it has not reached before, and no list is ever dropped.
+def test_level_changes_do_not_shift_the_lists():
+    graph = fractionalalgo1.Algorithm(0.1, 60)
+    updates = list(WORKLOADS["hubchurn"](60, 0, 2).updates(UPDATES))
+    for operation, u, v in updates[:UPDATES // 2]:
+        graph.insert(u, v) if operation == "ins" else graph.delete(u, v)
+    before = [{id(bucket) for bucket in lists} for lists in graph.neighbours]
+    lengths = [len(lists) for lists in graph.neighbours]
+    for operation, u, v in updates[UPDATES // 2:]:
+        graph.insert(u, v) if operation == "ins" else graph.delete(u, v)
+    for v in range(graph.n):
+        after = {id(bucket) for bucket in graph.neighbours[v]}
+        assert before[v] <= after and len(after) - len(before[v]) == len(graph.neighbours[v]) - lengths[v]
+
+
+def test_batches_and_snapshots_keep_the_lists(tmp_path):
+    graph = fractionalalgo1.Algorithm(0.2, 60)
+    edges = set()
+    for chunk in chunked(WORKLOADS["adversarial"](60, 0, 3).updates(UPDATES), 50):
+        graph.apply_batch(chunk)
+        for operation, u, v in chunk:
+            if operation == "ins":
+                edges.add((u, v))
+            else:
+                edges.discard((u, v))
+        check(graph, edges)
+    graph.snapshot(str(tmp_path / "graph.snapshot"))
+    check(fractionalalgo1.Algorithm.restore(str(tmp_path / "graph.snapshot")), edges)
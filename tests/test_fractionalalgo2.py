@@ -0,0 +1,68 @@
+import pytest
+from algorithms import load_algorithm
+from workloads import WORKLOADS
+from batching import chunked
+
+fractionalalgo2 = load_algorithm("fractional2")
+ACTIVE, PASSIVE = fractionalalgo2.ACTIVE, fractionalalgo2.PASSIVE
+
+UPDATES = 3000
+
+
+# The invariants of Section 5: every real edge has a tight endpoint, so the tight nodes cover the graph, every node above level 0
+# is tight, and no node carries more than a weight of 1.
+def check(graph):
+    for state in [ACTIVE, PASSIVE]:
+        for level in graph.edges[state]:
+            for e in level:
+                u, v = graph.edge_u[e], graph.edge_v[e]
+                assert graph.is_tight[u] or graph.is_tight[v], (u, v)
+    for v in range(graph.n):
+        assert graph.level[v] == 0 or graph.is_tight[v], v
+        assert graph.node_weight[v] <= 1 + 1e-9, v
+        assert graph.is_tight[v] == (graph.tight_pointers[v] != None)
+
+
+# Checks the invariants after every rebuild, as well as after every update.
+def checked(graph):
+    rebuild = graph.rebuild
+    def checked_rebuild(k):
+        rebuild(k)
+        check(graph)
+    graph.rebuild = checked_rebuild
+    return graph
+
+
+@pytest.mark.parametrize("model", sorted(WORKLOADS))
+@pytest.mark.parametrize("epsilon", [0.1, 0.5])
+def test_tight_nodes_cover_the_graph(model, epsilon):
+    graph = checked(fractionalalgo2.Algorithm(epsilon, 60))
+    for operation, u, v in WORKLOADS[model](60, 0, 1).updates(UPDATES):
+        if operation == "ins":
+            graph.insert(u, v)
+        else:
+            graph.delete(u, v)
+        check(graph)
+
+
+@pytest.mark.parametrize("model", ["uniform", "adversarial"])
+def test_batches_keep_the_invariants(model):
+    graph = checked(fractionalalgo2.Algorithm(0.2, 60))
+    for chunk in chunked(WORKLOADS[model](60, 0, 2).updates(UPDATES), 50):
+        graph.apply_batch(chunk)
+        check(graph)
+
+
+# A rebuild of levels 0 to k is paid for by the e times its size deletions that ran out the counter of level k, so the edges moved
+# by all rebuilds add up to O(updates/e). The constant is about 1.5 on these workloads.
+@pytest.mark.parametrize("model", sorted(WORKLOADS))
+@pytest.mark.parametrize("epsilon", [0.1, 0.3, 1.0])
+def test_rebuild_cost_is_amortized(model, epsilon):
+    graph = fractionalalgo2.Algorithm(epsilon, 100)
+    stats = graph.enable_stats()
+    for operation, u, v in WORKLOADS[model](100, 0, 3).updates(UPDATES):
+        if operation == "ins":
+            graph.insert(u, v)
+        else:
+            graph.delete(u, v)
+    assert stats.totals.get("rebuild_size", 0) <= 4 * UPDATES / epsilon
@@ -0,0 +1,125 @@
+import sys, random
+import pytest
+from algorithms import load_algorithm
+from workloads import WORKLOADS
+from instrumentation import Stats
+
+integralalgo1 = load_algorithm("integral1")
+Vertex_Cover = integralalgo1.Vertex_Cover
+Free_Buckets = sys.modules[Vertex_Cover.__module__].Free_Buckets
+
+UPDATES = 3000
+
+
+def replay(vc, updates, check):
+    edges = set()
+    for operation, u, v in updates:
+        mates = list(vc.mate)
+        if operation == "ins":
+            vc.insert(u, v)
+            edges.add((u, v))
+        else:
+            vc.delete(u, v)
+            edges.discard((u, v))
+        check(vc, edges, mates)
+
+
+# Bit i of v's bitset is set exactly when the i-th neighbour of v is free, the bitset has one word per 64 neighbours,
+# and the count of free neighbours matches the bits.
+def check_bitsets(vc, edges, mates):
+    for u in range(vc.n):
+        words = vc.free_nbhrs[u]
+        assert len(words) == (vc.degree[u] + 63) // 64
+        for i, w in enumerate(vc.neighbours[u]):
+            assert (words[i >> 6] >> (i & 63) & 1) == vc.is_free(w), (u, w)
+        assert vc.free_counts[u] == sum(bin(word).count("1") for word in words)
+        assert vc.free_counts[u] == sum(1 for w in vc.neighbours[u] if vc.is_free(w))
+    for u, v in edges:
+        assert vc.in_cover(u) or vc.in_cover(v), (u, v)
+    for u, v in vc.matching:
+        assert vc.mate[u] == v and vc.mate[v] == u
+
+
+# Marking a node matched or free writes one bit in each neighbour's bitset, so the words touched by an update are bounded by the
+# degrees of the nodes whose mate changed, plus the scans of the searches for a free neighbour, which stop at the first one.
+def check_work(vc, edges, mates):
+    changed = [v for v in range(vc.n) if vc.mate[v] != (mates[v] if v < len(mates) else None)]
+    scan = (max(vc.degree) + 63) // 64 + 1
+    assert vc.words <= 2 * sum(vc.degree[v] + 1 for v in changed) + 4 + 4 * scan
+
+
+@pytest.mark.parametrize("model", ["uniform", "adversarial", "powerlaw", "hubchurn"])
+def test_bitsets_follow_the_mates(model):
+    vc = Vertex_Cover(1)
+    vc.stats = Stats()
+    replay(vc, WORKLOADS[model](150, 0, 3).updates(UPDATES), lambda vc, edges, mates: (check_bitsets(vc, edges, mates), check_work(vc, edges, mates)))
+    assert vc.stats.current.get("aug_paths", 0) > 0 or model == "uniform"
+
+
+# A hub with hundreds of neighbours spans several words, so the scans and the shrinking of the bitsets cross word boundaries.
+def test_bitsets_span_several_words():
+    vc = Vertex_Cover(400)
+    updates = [("ins", 0, v) for v in range(1, 400)] + [("ins", v, v + 1) for v in range(1, 399, 2)]
+    updates += [("del", 0, v) for v in range(1, 400, 3)] + [("del", v, v + 1) for v in range(1, 399, 4)]
+    replay(vc, updates, lambda vc, edges, mates: (check_bitsets(vc, edges, mates), check_work(vc, edges, mates)))
+
+
+# Every free node sits in the bucket of its degree, and top is the highest non-empty bucket.
+def check_free_buckets(vc, edges, mates):
+    buckets = vc.free_nodes
+    for v in range(vc.n):
+        if vc.is_free(v):
+            assert buckets.buckets[vc.degree[v]][buckets.positions[v]] == v
+        else:
+            assert buckets.positions[v] == None
+    assert sum(len(bucket) for bucket in buckets.buckets) == sum(1 for v in range(vc.n) if vc.is_free(v))
+    free_degrees = [vc.degree[v] for v in range(vc.n) if vc.is_free(v)]
+    assert buckets.top == max(free_degrees, default=0)
+    node = buckets.max_degree()
+    assert (node == None) == (len(free_degrees) == 0)
+    if node != None:
+        assert vc.is_free(node) and vc.degree[node] == buckets.top
+
+
+@pytest.mark.parametrize("model", ["uniform", "powerlaw", "hubchurn"])
+def test_free_buckets_follow_the_free_nodes(model, tmp_path):
+    vc = Vertex_Cover(1)
+    replay(vc, WORKLOADS[model](150, 0, 5).updates(UPDATES), check_free_buckets)
+    vc.snapshot(str(tmp_path / "vc.snapshot"))
+    restored = Vertex_Cover.restore(str(tmp_path / "vc.snapshot"))
+    assert restored.free_nodes.top == vc.free_nodes.top
+    assert restored.free_nodes.buckets == vc.free_nodes.buckets
+    check_free_buckets(restored, set(), [])
+
+
+# A move changes the degree of one node by one, so top moves by at most one, and only to the bucket the node moved to.
+def test_moves_shift_the_top_by_at_most_one():
+    rand = random.Random(2)
+    buckets = Free_Buckets(50)
+    degrees = [0] * 50
+    for step in range(20000):
+        v = rand.randrange(50)
+        new_degree = degrees[v] + 1 if degrees[v] == 0 or rand.random() < 0.5 else degrees[v] - 1
+        top = buckets.top
+        buckets.move(v, degrees[v], new_degree)
+        degrees[v] = new_degree
+        assert buckets.top == max(degrees)
+        assert abs(buckets.top - top) <= 1
+        assert degrees[buckets.max_degree()] == buckets.top
+
+
+# The hub is adjacent to k nodes which are matched to leaves, so it stays free when its edges are inserted. Once a deletion leaves
+# it with more than sqrt(2m) neighbours, it is the free node of maximum degree, and it takes the place of a leaf through surrogate.
+def test_a_free_node_of_high_degree_is_matched_after_a_deletion():
+    k = 20
+    vc = Vertex_Cover(2 * k + 3)
+    hub = 2 * k
+    for i in range(k):
+        vc.insert(i, k + i)
+    for i in range(k):
+        vc.insert(hub, i)
+    vc.insert(hub + 1, hub + 2)
+    assert vc.is_free(hub) and vc.free_nodes.max_degree() == hub
+    vc.delete(hub + 1, hub + 2)
+    assert not vc.is_free(hub)
+    check_free_buckets(vc, set(), [])
@@ -0,0 +1,124 @@
+import math
+import pytest
+from algorithms import load_algorithm
+from workloads import WORKLOADS
+
+integralalgo2 = load_algorithm("integral2")
+Vertex_Cover = integralalgo2.Vertex_Cover
+
+UPDATES = 4000
+
+
+def replay(structure, updates, check):
+    edges = set()
+    for operation, u, v in updates:
+        if operation == "ins":
+            structure.insert(u, v)
+            edges.add((u, v))
+        else:
+            structure.delete(u, v)
+            edges.discard((u, v))
+        check(structure, edges, u, v)
+
+
+# Checks a vertex cover after each update. The D it had before the update is kept, to check that D only changes when the bit length of m does.
+# With cover False, the endpoints of the matching need not cover the graph, for the updates that leave an edge with two free endpoints on purpose.
+class Cover_Check:
+    def __init__(self, cover=True):
+        self.cover = cover
+        self.D = None
+        self.level = None
+
+    # Each endpoint scans at most D of its neighbours, and no more than it has, and D = O(sqrt(m)/e) since m is only rounded up to a power of two.
+    # A free node still scans every neighbour when its degree is below D, so the endpoints of the matching cover the graph.
+    def __call__(self, vc, edges, u, v):
+        assert vc.scanned <= min(vc.D, len(vc.edges[u])) + min(vc.D, len(vc.edges[v]))
+        assert vc.D <= math.ceil(8 * (2 * max(vc.num_edges, 1))**0.5 / vc.epsilon)
+        level = vc.num_edges.bit_length()
+        if level == self.level:
+            assert vc.D == self.D
+        self.D = vc.D
+        self.level = level
+        for u, v in edges:
+            assert not self.cover or vc.in_cover(u) or vc.in_cover(v), (u, v)
+        for u, v in vc.matching:
+            assert vc.mate[u] == v and vc.mate[v] == u
+
+
+@pytest.mark.parametrize("model", ["adversarial", "powerlaw"])
+@pytest.mark.parametrize("epsilon", [0.1, 1.0, 4.0])
+def test_work_per_update_is_bounded(model, epsilon):
+    vc = Vertex_Cover(1, epsilon)
+    replay(vc, WORKLOADS[model](200, 100, 5).updates(UPDATES), Cover_Check())
+
+
+def edges_of(vc):
+    return [(u, v) for u in range(vc.n) for v in vc.edges[u]]
+
+
+# The positions of w's adjacency list that its next scan examines, starting at its cursor and wrapping around at the end.
+def scan_positions(vc, w):
+    positions = []
+    pos = vc.cursor[w]
+    for i in range(min(vc.D, len(vc.edges[w]))):
+        if pos >= len(vc.edges[w]):
+            pos = 0
+        positions.append(pos)
+        pos += 1
+    return positions
+
+
+# w is joined to K nodes x_i, each matched to a leaf y_i, so deg(w) is several times D. x_j is then freed by deleting its matched edge,
+# and its own scan stops before it reaches w, which sits more than D places down its list, so that the edge (w, x_j) is left uncovered. Each edge inserted at w then makes w scan
+# the next D entries of its list: the scans cover disjoint ranges of positions, and the one that finds x_j looks past the first D entries.
+def test_scans_resume_where_the_last_one_stopped():
+    K = 60
+    w = 0
+    x = list(range(1, K + 1))
+    y = list(range(K + 1, 2 * K + 1))
+    j = K - 10
+    vc = Vertex_Cover(2 * K + 1, 16)
+    check = Cover_Check(cover=False)
+    updates = [("ins", x[i], y[i]) for i in range(K)]
+    updates += [("ins", x[j], y[i]) for i in range(24)]
+    updates += [("ins", w, x[i]) for i in range(K)]
+    updates += [("ins", x[j], y[K - 1]), ("del", x[j], y[j])]
+    replay(vc, updates, check)
+    assert vc.is_free(w) and vc.is_free(x[j])
+    assert len(vc.edges[w]) > 3 * vc.D
+    assert sum(1 for z in vc.edges[w] if vc.is_free(z)) == 1
+
+    target = vc.edge_pointers[x[j]][w]
+    scans = []
+    leaf = 2 * K + 1
+    while vc.is_free(w):
+        positions = scan_positions(vc, w)
+        for scan in scans:
+            assert scan.isdisjoint(positions)
+        scans.append(set(positions))
+        D = vc.D
+        replay(vc, [("ins", leaf, leaf + 1), ("ins", w, leaf)], check)
+        leaf += 2
+        if vc.is_free(w):
+            assert vc.scanned == D
+        else:
+            assert vc.scanned == positions.index(target) + 1
+    assert vc.mate[w] == x[j]
+    for u, v in edges_of(vc):
+        assert vc.in_cover(u) or vc.in_cover(v)
+    assert len(scans) > 1 and target in scans[-1]
+    assert all(target not in scan for scan in scans[:-1])
+
+
+def check_driver(graph, edges, u, v):
+    for u, v in edges:
+        assert graph.in_cover(u) or graph.in_cover(v), (u, v)
+    for u in range(graph.n):
+        v = graph.mate(u)
+        assert v == None or (graph.mate(v) == u and ((u, v) in edges or (v, u) in edges))
+
+
+@pytest.mark.parametrize("model", ["adversarial", "powerlaw"])
+def test_driver_cover_stays_valid(model):
+    graph = integralalgo2.Algorithm(0.5, 1, 60)
+    replay(graph, WORKLOADS[model](120, 60, 6).updates(UPDATES), check_driver)
@@ -0,0 +1,52 @@
+import pytest
+from algorithms import load_algorithm
+from workloads import WORKLOADS
+from batching import chunked
+
+integral_rounding = load_algorithm("maximal")
+
+UPDATES = 3000
+
+
+# Every node keeps exactly the edges it owns, the free keepers of v are the free nodes keeping an edge to v,
+# and the matching is maximal in the whole graph.
+def check(graph, edges):
+    level = graph.fractional.level
+    for v in range(graph.n):
+        owned = {u for u in graph.fractional.nbhd_pointers[v] if level[u] <= level[v]}
+        assert set(graph.kept[v]) == owned, v
+        keepers = {u for u in graph.fractional.nbhd_pointers[v] if graph.is_free(u) and v in graph.kept_pointers[u]}
+        assert set(graph.free_keepers[v]) == keepers, v
+    for u, v in edges:
+        assert not (graph.is_free(u) and graph.is_free(v)), (u, v)
+    for u, v in graph.matched_edges():
+        assert graph.mate(u) == v and graph.mate(v) == u
+        assert (u, v) in edges or (v, u) in edges
+
+
+@pytest.mark.parametrize("model", ["uniform", "adversarial", "hubchurn"])
+@pytest.mark.parametrize("epsilon", [0.1, 1.0])
+def test_matching_is_maximal(model, epsilon):
+    graph = integral_rounding.Algorithm(epsilon, 1)
+    edges = set()
+    for operation, u, v in WORKLOADS[model](80, 0, 4).updates(UPDATES):
+        if operation == "ins":
+            graph.insert(u, v)
+            edges.add((u, v))
+        else:
+            graph.delete(u, v)
+            edges.discard((u, v))
+        check(graph, edges)
+
+
+def test_batches_keep_the_matching_maximal():
+    graph = integral_rounding.Algorithm(1.0, 80)
+    edges = set()
+    for chunk in chunked(WORKLOADS["adversarial"](80, 0, 5).updates(UPDATES), 40):
+        graph.apply_batch(chunk)
+        for operation, u, v in chunk:
+            if operation == "ins":
+                edges.add((u, v))
+            else:
+                edges.discard((u, v))
+        check(graph, edges)
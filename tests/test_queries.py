@@ -0,0 +1,85 @@
+import time
+import pytest
+from algorithms import ALGORITHMS, load_algorithm, create_algorithm, is_integral
+from workloads import WORKLOADS
+
+fractionalalgo2 = load_algorithm("fractional2")
+
+
+def replay(name, n, updates, seed):
+    bip_cut = n // 2 if ALGORITHMS[name][0].startswith("integral") else 0
+    graph = create_algorithm(name, 0.2, n, bip_cut)
+    edges = set()
+    for operation, u, v in WORKLOADS["uniform"](n, bip_cut, seed).updates(updates):
+        if operation == "ins":
+            graph.insert(u, v)
+            edges.add((u, v))
+        else:
+            graph.delete(u, v)
+            edges.discard((u, v))
+    return graph, edges
+
+
+# The weight of the fractional matching, summed over the edges from the algorithm's own per-edge state.
+def recomputed_weight(name, graph, edges):
+    if name == "fractional1":
+        return sum(graph.edge_weight(u, v) for u, v in edges)
+    if name == "fractional2":
+        return sum(graph.edge_weights[e] for state in [fractionalalgo2.ACTIVE, fractionalalgo2.PASSIVE] for level in graph.edges[state] for e in level)
+    if name == "maximal":
+        return sum(graph.fractional.edge_weight(u, v) for u, v in edges)
+    return graph.matching_size()
+
+
+@pytest.mark.parametrize("name", sorted(ALGORITHMS))
+def test_queries_match_the_state(name):
+    graph, edges = replay(name, 80, 3000, 4)
+    cover = graph.vertex_cover()
+    assert graph.cover_size() == len(cover) == len(set(cover))
+    assert set(graph.cover_nodes()) == set(cover)
+    for v in range(graph.n):
+        assert graph.in_cover(v) == (v in cover)
+    for u, v in edges:
+        assert graph.in_cover(u) or graph.in_cover(v)
+
+    matched = list(graph.matched_edges())
+    assert graph.matching_size() == len(matched)
+    mates = {}
+    for u, v in matched:
+        assert (u, v) in edges or (v, u) in edges
+        mates[u] = v
+        mates[v] = u
+    assert len(mates) == 2 * len(matched)
+    for v in range(graph.n):
+        assert graph.mate(v) == mates.get(v)
+    if not is_integral(name):
+        assert len(matched) == 0
+    assert graph.fractional_weight() == pytest.approx(recomputed_weight(name, graph, edges))
+
+
+def query_time(graph, nodes):
+    best = None
+    for repeat in range(5):
+        start = time.perf_counter()
+        for v in nodes:
+            graph.cover_size()
+            graph.matching_size()
+            graph.fractional_weight()
+            graph.in_cover(v)
+            graph.mate(v)
+            graph.cover_nodes()
+            graph.matched_edges()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best == None else min(best, elapsed)
+    return best
+
+
+# The queries read the maintained state, so they take as long on a graph a hundred times larger. A scan of the cover or the matching
+# would take about a hundred times longer; the margin leaves room for noise.
+@pytest.mark.parametrize("name", sorted(ALGORITHMS))
+def test_queries_take_constant_time(name):
+    small, edges = replay(name, 40, 400, 5)
+    large, edges = replay(name, 4000, 40000, 5)
+    assert large.cover_size() > 20 * max(1, small.cover_size())
+    nodes = list(range(40)) * 50
+    assert query_time(large, nodes) < 10 * query_time(small, nodes)
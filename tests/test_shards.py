@@ -0,0 +1,17 @@
+import pytest
+from shards import ShardedEngine, tenant_updates, DEFAULTS
+
+
+# The batches are cut per graph, so every graph ends in the same state whatever the number of workers, and whether or not shards move.
+@pytest.mark.parametrize("name", ["fractional1", "maximal"])
+def test_results_do_not_depend_on_workers(name):
+    updates = tenant_updates(dict(DEFAULTS, graphs="100", updates="20000", n="30"), 0)
+    results = []
+    for workers in [1, 3]:
+        engine = ShardedEngine(name, 0.1, workers, shards=32)
+        engine.apply(updates[:10000])
+        engine.rebalance()
+        engine.apply(updates[10000:])
+        results.append(([engine.result(graph_id) for graph_id in range(100)], engine.aggregate()))
+        engine.close()
+    assert results[0] == results[1]
@@ -0,0 +1,39 @@
+import os
+import sweep
+from update_log import BinaryUpdateWriter
+from workloads import WORKLOADS, stream
+
+
+def write_trace(path, n, bip_cut):
+    writer = BinaryUpdateWriter(path, 0.1, n, bip_cut)
+    stream(WORKLOADS["uniform"](n, bip_cut, 0), 2000, writer)
+    writer.close()
+
+
+# Without a bipartition there is no maximum matching, and the ratios are bounded with a maximal matching instead.
+def test_ratio_is_bounded_on_general_graphs(tmp_path):
+    path = str(tmp_path / "trace.bin")
+    write_trace(path, 60, 0)
+    summary = sweep.sweep(path, {"algorithms": "fractional1,fractional2,maximal", "epsilon": "0.1,0.5", "batch": "0", "workers": "2"})
+    assert summary["maximum_matching"] == None and summary["maximal_matching"] > 0
+    assert len(summary["results"]) == 6
+    for result in summary["results"]:
+        assert "error" not in result and "ratio" not in result
+        assert result["ratio_bound"] >= 1
+
+
+# A worker killed without reporting leaves its combination without a result, which is reported instead of waited on forever.
+# A result the worker queued just before dying may be lost with it, so only the combination it died on is sure to be reported.
+def test_dead_worker_is_reported(tmp_path, monkeypatch):
+    path = str(tmp_path / "trace.bin")
+    write_trace(path, 40, 20)
+    run = sweep.run
+    def dying_run(name, epsilon, *args):
+        if name == "fractional2":
+            os._exit(9)
+        return run(name, epsilon, *args)
+    monkeypatch.setattr(sweep, "run", dying_run)
+    summary = sweep.sweep(path, {"algorithms": "fractional1,fractional2", "epsilon": "0.1", "batch": "0", "workers": "1"})
+    results = {result["algorithm"]: result for result in summary["results"]}
+    assert len(summary["results"]) == 2
+    assert "no result" in results["fractional2"]["error"] and "9" in results["fractional2"]["error"]